@@ -0,0 +1,23 @@
+"""
+共用執行緒池
+
+PDF 解析與 AI API 呼叫都是阻塞操作，集中到一個行程層級、
+有上限的執行緒池中執行：併發請求共享解析 CPU，等待 AI 回應時
+也不會佔住額外資源。
+
+執行緒數可透過環境變數 TASK_WORKERS 調整（預設 16）。
+
+關於 async：曾評估把 AI 端點改成 async view（flask[async] 或遷移到
+Quart + httpx AsyncClient），讓等待 AI 回應時能釋放 worker。本服務是
+WSGI + requests 的同步堆疊，改 async 需要更換 HTTP 客戶端與部署模型，
+收益可以先由「執行緒池 + gunicorn gthread worker」達成，暫不遷移。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv('TASK_WORKERS', '16')),
+    thread_name_prefix='task-worker'
+)
+
+__all__ = ['EXECUTOR']
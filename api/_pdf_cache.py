@@ -0,0 +1,180 @@
+"""
+PDF 解析結果快取
+
+以 (檔案內容 SHA-256, 密碼) 為 key 的行程內 LRU。同一份附件重複上傳
+（每月對帳單重寄、失敗重試、AI 重跑）時直接取回解析結果，
+跳過整個 PDF 解析流程。
+
+快取的結果字典視為唯讀，呼叫端不應修改。
+大小可透過環境變數 PDF_CACHE_SIZE 調整（預設 256）。
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+_EXTRACT_CACHE = OrderedDict()
+_EXTRACT_CACHE_SIZE = int(os.getenv('PDF_CACHE_SIZE', '256'))
+_extract_cache_lock = threading.Lock()
+
+# 全文備援存放區：LRU 是行程內的，gunicorn 多 worker 部署時
+# full-text 的後續 GET 可能落在沒解析過該檔的 worker；把全文
+# 另外寫到所有 worker 都讀得到的目錄，未命中時從這裡取
+_TEXT_SPILL_DIR = os.getenv('PDF_TEXT_CACHE_DIR') or os.path.join(
+    tempfile.gettempdir(), 'task_service_fulltext'
+)
+_TEXT_SPILL_MAX = int(os.getenv('PDF_TEXT_CACHE_FILES', '256'))
+
+# digest 來自 URL，先驗證格式再拿去組檔案路徑
+_DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+
+
+def file_sha256(path: str) -> str:
+    """計算檔案內容的 SHA-256（分塊讀取，不一次載入整份檔案）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cached(digest: str, password=None):
+    """
+    以內容雜湊查詢已快取的解析結果
+
+    Args:
+        digest: 檔案內容的 SHA-256
+        password: PDF 密碼（選填，為快取 key 的一部分）
+
+    Returns:
+        解析結果字典；未命中時為 None
+    """
+    with _extract_cache_lock:
+        cached = _EXTRACT_CACHE.get((digest, password))
+        if cached is not None:
+            _EXTRACT_CACHE.move_to_end((digest, password))
+        return cached
+
+
+def _extract_with_cache(parser, source, digest: str, password):
+    """以 (digest, password) 查快取，未命中才實際解析"""
+    cache_key = (digest, password)
+
+    with _extract_cache_lock:
+        cached = _EXTRACT_CACHE.get(cache_key)
+        if cached is not None:
+            _EXTRACT_CACHE.move_to_end(cache_key)
+            return cached
+
+    result = parser.extract_text(source, password)
+
+    with _extract_cache_lock:
+        _EXTRACT_CACHE[cache_key] = result
+        while len(_EXTRACT_CACHE) > _EXTRACT_CACHE_SIZE:
+            _EXTRACT_CACHE.popitem(last=False)
+
+    return result
+
+
+def extract_cached(parser, filepath: str, password=None):
+    """
+    解析 PDF 檔案，內容相同的檔案直接回傳快取結果
+
+    Args:
+        parser: PDFParser 實例
+        filepath: PDF 檔案路徑
+        password: PDF 密碼（選填，為快取 key 的一部分）
+
+    Returns:
+        PDFParser.extract_text 的解析結果字典
+    """
+    return _extract_with_cache(parser, filepath, file_sha256(filepath), password)
+
+
+def extract_cached_bytes(parser, data: bytes, password=None, digest=None):
+    """
+    解析記憶體中的 PDF 內容，不經過磁碟
+
+    上傳內容已在記憶體時（file.read()），直接對 bytes 計算雜湊、
+    以 BytesIO 餵給解析器，整條路徑零磁碟 I/O。
+
+    Args:
+        parser: PDFParser 實例
+        data: PDF 檔案內容
+        password: PDF 密碼（選填，為快取 key 的一部分）
+        digest: 已計算好的內容 SHA-256（選填；呼叫端若已為其他
+            用途計算過雜湊，傳入可避免再掃一次整份內容）
+
+    Returns:
+        PDFParser.extract_text 的解析結果字典
+    """
+    if digest is None:
+        digest = hashlib.sha256(data).hexdigest()
+    return _extract_with_cache(parser, io.BytesIO(data), digest, password)
+
+
+def _spill_path(digest: str, password) -> str:
+    """組出全文備援檔路徑（密碼只取雜湊前綴，不落地明文）"""
+    pwd_part = (
+        hashlib.sha256(password.encode('utf-8')).hexdigest()[:16]
+        if password else 'nopass'
+    )
+    return os.path.join(_TEXT_SPILL_DIR, f'{digest}.{pwd_part}.txt')
+
+
+def spill_text(digest: str, password, text: str) -> None:
+    """
+    把解析出的全文寫進跨行程共用的備援區
+
+    寫入走暫存檔 + os.replace 原子替換，其他 worker 不會讀到
+    半寫入的內容；超過 PDF_TEXT_CACHE_FILES 時淘汰最舊的檔案。
+    備援寫入失敗不影響主要回應，只是退回單 worker 的命中率。
+    """
+    try:
+        os.makedirs(_TEXT_SPILL_DIR, mode=0o700, exist_ok=True)
+        path = _spill_path(digest, password)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+        entries = [
+            os.path.join(_TEXT_SPILL_DIR, name)
+            for name in os.listdir(_TEXT_SPILL_DIR)
+            if name.endswith('.txt')
+        ]
+        if len(entries) > _TEXT_SPILL_MAX:
+            entries.sort(key=os.path.getmtime)
+            for stale in entries[:len(entries) - _TEXT_SPILL_MAX]:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+
+
+def open_spilled_text(digest: str, password=None):
+    """
+    開啟備援區中的全文檔
+
+    Args:
+        digest: 檔案內容的 SHA-256（來自 URL，先驗證格式）
+        password: 解析時使用的 PDF 密碼（選填）
+
+    Returns:
+        可逐塊讀取的文字檔物件；沒有該檔或 digest 格式不對時為 None
+    """
+    if not _DIGEST_RE.fullmatch(digest):
+        return None
+    try:
+        return open(_spill_path(digest, password), 'r', encoding='utf-8')
+    except OSError:
+        return None
+
+
+__all__ = ['extract_cached', 'extract_cached_bytes', 'file_sha256',
+           'get_cached', 'spill_text', 'open_spilled_text']
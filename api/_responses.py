@@ -0,0 +1,74 @@
+"""
+靜態 JSON 回應工具
+
+部分端點（health、ping、文件類型、遮罩類型）回傳的內容固定不變，
+但 jsonify 每次請求都會重新序列化。這裡把 JSON 內容序列化一次，
+附上 ETag 與 Cache-Control，讓客戶端與反向代理可以用 304 短路。
+"""
+import hashlib
+import json
+from flask import Response, request
+
+# orjson 序列化（需要安裝 orjson 套件，未安裝時退回標準庫 json）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def ojsonify(payload, status: int = 200) -> Response:
+    """
+    以 orjson 序列化的 jsonify 替代品
+
+    orjson 直接輸出 UTF-8 bytes，比標準庫編碼器快數倍，
+    適合 AI 分析結果這類較大的巢狀回應。
+
+    Args:
+        payload: 要序列化的物件
+        status: HTTP 狀態碼
+
+    Returns:
+        application/json 的 Flask Response
+    """
+    if ORJSON_AVAILABLE:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    return Response(body, status=status, mimetype='application/json')
+
+
+class StaticJSONResponse:
+    """預先序列化的 JSON 回應（含 ETag / Cache-Control）"""
+
+    def __init__(self, payload: dict, max_age: int = 60):
+        """
+        Args:
+            payload: 要序列化的回應內容（建立後不應再變動）
+            max_age: Cache-Control 的 max-age 秒數
+        """
+        self.body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.etag = hashlib.md5(self.body).hexdigest()
+        self.headers = {
+            'ETag': self.etag,
+            'Cache-Control': f'public, max-age={max_age}'
+        }
+
+    def response(self) -> Response:
+        """
+        建立 Flask Response
+
+        客戶端帶有相符的 If-None-Match 時直接回 304，不傳輸 body。
+        """
+        if self.etag in request.if_none_match:
+            return Response(status=304, headers=self.headers)
+
+        return Response(
+            self.body,
+            mimetype='application/json',
+            headers=self.headers
+        )
+
+
+__all__ = ['StaticJSONResponse', 'ojsonify']
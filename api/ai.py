@@ -7,15 +7,148 @@ AI 處理相關 API
 - POST /api/ai/detect-sensitive: 偵測敏感資訊
 """
 
-from flask import request, jsonify
-from werkzeug.utils import secure_filename
+from flask import current_app, request
+from collections import Counter, defaultdict
+from functools import lru_cache
 import os
+import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
 from . import api_bp
-from utils.pdf_parser import PDFParser
+from ._executor import EXECUTOR
+from ._pdf_cache import extract_cached
+from ._responses import StaticJSONResponse, ojsonify
+from utils.pdf_parser import get_thread_parser
 from utils.privacy_masker import PrivacyMasker, SmartPrivacyMasker, detect_sensitive_info
 from utils.ai_integrator import AIIntegrator, AIProvider
 
 
+@lru_cache(maxsize=32)
+def _get_masker(mask_types: tuple = None, aggressive: bool = False):
+    """
+    取得快取的遮罩器實例
+
+    每次請求都重新建立遮罩器會重新編譯所有正則表達式，
+    改以設定（mask_types + aggressive）為 key 快取實例重複使用。
+
+    Args:
+        mask_types: 遮罩類型（排序後的 tuple，None 表示智慧遮罩）
+        aggressive: 智慧遮罩是否使用積極模式
+
+    Returns:
+        PrivacyMasker 或 SmartPrivacyMasker 實例
+    """
+    if mask_types is not None:
+        return PrivacyMasker(mask_types=list(mask_types))
+    return SmartPrivacyMasker(aggressive=aggressive)
+
+
+@lru_cache(maxsize=8)
+def _get_integrator(provider: AIProvider, model: str = None) -> AIIntegrator:
+    """
+    取得快取的 AI 整合器實例
+
+    以 (provider, model) 為 key 快取，避免每次請求重新初始化 AI 客戶端。
+    """
+    return AIIntegrator(provider=provider, model=model)
+
+
+# 暫存檔目錄：優先使用 tmpfs（/dev/shm），讓 PDF 上傳→解析全程走記憶體
+# 不落磁碟；可用 TASK_TMP_DIR 覆寫（需有足夠空間容納併發上傳）
+_TMP_DIR = os.getenv('TASK_TMP_DIR') or (
+    '/dev/shm' if os.path.isdir('/dev/shm') else None
+)
+
+# 單一 PDF 上傳大小上限（0 表示不另外設限，只受 MAX_CONTENT_LENGTH 約束）
+MAX_PDF_BYTES = int(os.getenv('MAX_PDF_BYTES', 0))
+
+
+def _max_pdf_bytes() -> int:
+    """
+    取得實際生效的 PDF 上傳大小上限
+
+    Flask 的 MAX_CONTENT_LENGTH 會在進入 view 之前就以 413 擋下
+    超過的請求，所以這裡宣告的上限不能比它大，否則檢查永遠不會
+    觸發、錯誤訊息也會報出錯誤的數字；以兩者中較小的為準。
+    """
+    content_limit = current_app.config.get('MAX_CONTENT_LENGTH') or 0
+    if MAX_PDF_BYTES and content_limit:
+        return min(MAX_PDF_BYTES, content_limit)
+    return MAX_PDF_BYTES or content_limit
+
+
+def _parse_mask_types(form):
+    """
+    解析表單中的 mask_types 參數
+
+    過濾空字串與多餘空白，讓 mask_types=""、mask_types="a,,b" 這類
+    輸入不會產生帶空元素的列表（否則會建立含無效類型的遮罩器，
+    也會汙染遮罩器快取的 key）。
+
+    Args:
+        form: request.form
+
+    Returns:
+        類型列表；未提供或全為空時為 None
+    """
+    raw = form.get('mask_types')
+    if not raw:
+        return None
+    types = [t.strip() for t in raw.split(',') if t.strip()]
+    return types or None
+
+
+def _precheck_upload(file):
+    """
+    在寫入暫存檔之前先驗證上傳內容
+
+    超大或非 PDF 的請求在這裡就擋下，省去整份檔案的寫入與清理。
+
+    Args:
+        file: werkzeug FileStorage
+
+    Returns:
+        驗證失敗時的錯誤 Response；通過時為 None
+    """
+    max_bytes = _max_pdf_bytes()
+    content_length = request.content_length
+    if max_bytes and content_length and content_length > max_bytes:
+        return ojsonify({
+            'error': f'檔案大小超過限制（最大 {max_bytes // (1024 * 1024)}MB）'
+        }, 413)
+
+    # PDF 檔案以 %PDF- 開頭
+    head = file.stream.read(5)
+    file.stream.seek(0)
+    if head != b'%PDF-':
+        return ojsonify({'error': '檔案不是有效的 PDF'}, 400)
+
+    return None
+
+
+def _save_and_extract(file, password=None):
+    """
+    將上傳檔案寫入暫存檔並解析 PDF
+
+    使用 NamedTemporaryFile 取代固定的 /tmp/<filename> 路徑：
+    併發上傳同名檔案不會互相覆蓋，離開 with 區塊即自動清理，
+    不需要 finally + os.remove。
+
+    解析結果以內容雜湊快取，同一份 PDF 重複上傳時直接取用。
+    快取的結果字典視為唯讀，呼叫端不應修改。
+
+    Args:
+        file: werkzeug FileStorage（上傳的 PDF）
+        password: PDF 密碼（選填）
+
+    Returns:
+        PDFParser.extract_text 的解析結果字典
+    """
+    with tempfile.NamedTemporaryFile(suffix='.pdf', dir=_TMP_DIR) as tmp:
+        file.save(tmp)
+        tmp.flush()
+        return extract_cached(get_thread_parser(), tmp.name, password)
+
+
 @api_bp.route('/ai/analyze-document', methods=['POST'])
 def analyze_document():
     """
@@ -38,11 +171,15 @@ def analyze_document():
     try:
         # 檢查檔案
         if 'file' not in request.files:
-            return jsonify({'error': '未提供檔案'}), 400
+            return ojsonify({'error': '未提供檔案'}, 400)
         
         file = request.files['file']
         if file.filename == '':
-            return jsonify({'error': '未選擇檔案'}), 400
+            return ojsonify({'error': '未選擇檔案'}, 400)
+
+        precheck_error = _precheck_upload(file)
+        if precheck_error:
+            return precheck_error
         
         # 取得參數
         password = request.form.get('password')
@@ -50,55 +187,55 @@ def analyze_document():
         model = request.form.get('model')
         document_type = request.form.get('document_type', 'financial')
         
-        # 儲存暫存檔案
-        filename = secure_filename(file.filename)
-        temp_path = f"/tmp/{filename}"
-        file.save(temp_path)
-        
+        # 解析 PDF（經由暫存檔，自動清理；丟給共用執行緒池限流）
+        # extract_text 以例外回報失敗（沒有 success 欄位）：
+        # 密碼問題回 403、頁數超標回 413，其他解析錯誤回 400
         try:
-            # 解析 PDF
-            parser = PDFParser()
-            result = parser.extract_text(temp_path, password)
-            
-            if not result['success']:
-                return jsonify({
-                    'error': 'PDF 解析失敗',
-                    'details': result.get('error')
-                }), 400
-            
-            # 取得文字內容
-            text = result['text']
-            
-            # AI 分析
-            provider_enum = AIProvider(provider)
-            integrator = AIIntegrator(provider=provider_enum, model=model)
-            ai_response = integrator.analyze_document(text, document_type)
-            
-            if not ai_response.success:
-                return jsonify({
-                    'error': 'AI 分析失敗',
-                    'details': ai_response.error
-                }), 500
-            
-            # 返回結果
-            return jsonify({
-                'success': True,
-                'analysis': ai_response.content,
-                'metadata': {
-                    'provider': ai_response.provider,
-                    'model': ai_response.model,
-                    'pages': result['total_pages'],
-                    'usage': ai_response.usage
-                }
-            })
-            
-        finally:
-            # 清理暫存檔案
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-    
+            result = EXECUTOR.submit(_save_and_extract, file, password).result()
+        except PermissionError as e:
+            return ojsonify({'error': 'PDF 加密錯誤', 'details': str(e)}, 403)
+        except ValueError as e:
+            return ojsonify({'error': str(e)}, 413)
+        except Exception as e:
+            return ojsonify({'error': 'PDF 解析失敗', 'details': str(e)}, 400)
+
+        # 取得文字內容
+        text = result['text']
+
+        # AI 分析（遠端 HTTP 等待同樣交由執行緒池）
+        provider_enum = AIProvider(provider)
+        integrator = _get_integrator(provider_enum, model)
+        # 伺服器端不讀寫 LLM 快取：HTTP 介面沒有快取的退出選項，
+        # 不該在呼叫端不知情下重播磁碟上的舊回應
+        ai_response = EXECUTOR.submit(
+            integrator.analyze_document, text, document_type,
+            use_cache=False
+        ).result()
+
+        if not ai_response.success:
+            return ojsonify({
+                'error': 'AI 分析失敗',
+                'details': ai_response.error
+            }, 500)
+
+        # 返回結果
+        return ojsonify({
+            'success': True,
+            'analysis': ai_response.content,
+            'metadata': {
+                'provider': ai_response.provider,
+                'model': ai_response.model,
+                'pages': result['total_pages'],
+                'usage': ai_response.usage
+            }
+        })
+
+    except RequestEntityTooLarge:
+        # 超過 MAX_CONTENT_LENGTH 在解析表單時才會觸發；
+        # 交給全域 413 handler 回報，不要吞成 500
+        raise
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}, 500)
 
 
 @api_bp.route('/ai/mask-and-analyze', methods=['POST'])
@@ -129,88 +266,96 @@ def mask_and_analyze():
     try:
         # 檢查檔案
         if 'file' not in request.files:
-            return jsonify({'error': '未提供檔案'}), 400
+            return ojsonify({'error': '未提供檔案'}, 400)
         
         file = request.files['file']
         if file.filename == '':
-            return jsonify({'error': '未選擇檔案'}), 400
+            return ojsonify({'error': '未選擇檔案'}, 400)
+
+        precheck_error = _precheck_upload(file)
+        if precheck_error:
+            return precheck_error
         
         # 取得參數
         password = request.form.get('password')
         provider = request.form.get('provider', 'openai')
         model = request.form.get('model')
         document_type = request.form.get('document_type', 'financial')
-        mask_types = request.form.get('mask_types', '').split(',') if request.form.get('mask_types') else None
+        mask_types = _parse_mask_types(request.form)
         aggressive = request.form.get('aggressive', 'false').lower() == 'true'
         
-        # 儲存暫存檔案
-        filename = secure_filename(file.filename)
-        temp_path = f"/tmp/{filename}"
-        file.save(temp_path)
-        
+        # 解析 PDF（經由暫存檔，自動清理；丟給共用執行緒池限流）
+        # extract_text 以例外回報失敗（沒有 success 欄位）：
+        # 密碼問題回 403、頁數超標回 413，其他解析錯誤回 400
         try:
-            # 解析 PDF
-            parser = PDFParser()
-            result = parser.extract_text(temp_path, password)
-            
-            if not result['success']:
-                return jsonify({
-                    'error': 'PDF 解析失敗',
-                    'details': result.get('error')
-                }), 400
-            
-            # 取得文字內容
-            text = result['text']
-            
-            # 遮罩個資
-            if mask_types:
-                masker = PrivacyMasker(mask_types=mask_types)
-            else:
-                masker = SmartPrivacyMasker(aggressive=aggressive)
-            
-            mask_result = masker.mask(text)
-            masked_text = mask_result.masked
-            
-            # AI 分析（使用遮罩後的文字）
-            provider_enum = AIProvider(provider)
-            integrator = AIIntegrator(provider=provider_enum, model=model)
-            ai_response = integrator.analyze_document(masked_text, document_type)
-            
-            if not ai_response.success:
-                return jsonify({
-                    'error': 'AI 分析失敗',
-                    'details': ai_response.error
-                }), 500
-            
-            # 返回結果
-            return jsonify({
-                'success': True,
-                'analysis': ai_response.content,
-                'masking': {
-                    'masked_count': mask_result.mask_count,
-                    'sensitive_items': [
-                        {
-                            'type': item['type_name'],
-                            'masked_value': item['masked']
-                        }
-                        for item in mask_result.sensitive_items
-                    ]
-                },
-                'metadata': {
-                    'provider': ai_response.provider,
-                    'model': ai_response.model,
-                    'pages': result['total_pages'],
-                    'usage': ai_response.usage
-                }
-            })
-            
-        finally:
-            # 清理暫存檔案
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-    
+            result = EXECUTOR.submit(_save_and_extract, file, password).result()
+        except PermissionError as e:
+            return ojsonify({'error': 'PDF 加密錯誤', 'details': str(e)}, 403)
+        except ValueError as e:
+            return ojsonify({'error': str(e)}, 413)
+        except Exception as e:
+            return ojsonify({'error': 'PDF 解析失敗', 'details': str(e)}, 400)
+
+        # 遮罩個資（遮罩器依設定快取重複使用）
+        if mask_types:
+            masker = _get_masker(mask_types=tuple(sorted(mask_types)))
+        else:
+            masker = _get_masker(aggressive=aggressive)
+
+        # 逐頁遮罩：大型 PDF 不用同時持有整份原文與整份遮罩副本
+        masked_chunks = []
+        sensitive_items = []
+        mask_count = 0
+        for page in result['pages']:
+            page_result = masker.mask(page['text'])
+            masked_chunks.append(page_result.masked)
+            mask_count += page_result.mask_count
+            sensitive_items.extend(page_result.sensitive_items)
+        masked_text = '\n\n'.join(masked_chunks)
+
+        # AI 分析（使用遮罩後的文字；遠端 HTTP 等待交由執行緒池）
+        provider_enum = AIProvider(provider)
+        integrator = _get_integrator(provider_enum, model)
+        # 伺服器端不讀寫 LLM 快取（理由同 analyze_document 端點）
+        ai_response = EXECUTOR.submit(
+            integrator.analyze_document, masked_text, document_type,
+            use_cache=False
+        ).result()
+
+        if not ai_response.success:
+            return ojsonify({
+                'error': 'AI 分析失敗',
+                'details': ai_response.error
+            }, 500)
+
+        # 返回結果
+        return ojsonify({
+            'success': True,
+            'analysis': ai_response.content,
+            'masking': {
+                'masked_count': mask_count,
+                'sensitive_items': [
+                    {
+                        'type': item['type_name'],
+                        'masked_value': item['masked']
+                    }
+                    for item in sensitive_items
+                ]
+            },
+            'metadata': {
+                'provider': ai_response.provider,
+                'model': ai_response.model,
+                'pages': result['total_pages'],
+                'usage': ai_response.usage
+            }
+        })
+
+    except RequestEntityTooLarge:
+        # 超過 MAX_CONTENT_LENGTH 在解析表單時才會觸發；
+        # 交給全域 413 handler 回報，不要吞成 500
+        raise
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}, 500)
 
 
 @api_bp.route('/ai/detect-sensitive', methods=['POST'])
@@ -239,66 +384,76 @@ def detect_sensitive():
     try:
         # 檢查檔案
         if 'file' not in request.files:
-            return jsonify({'error': '未提供檔案'}), 400
+            return ojsonify({'error': '未提供檔案'}, 400)
         
         file = request.files['file']
         if file.filename == '':
-            return jsonify({'error': '未選擇檔案'}), 400
+            return ojsonify({'error': '未選擇檔案'}, 400)
+
+        precheck_error = _precheck_upload(file)
+        if precheck_error:
+            return precheck_error
         
         # 取得參數
         password = request.form.get('password')
-        mask_types = request.form.get('mask_types', '').split(',') if request.form.get('mask_types') else None
-        
-        # 儲存暫存檔案
-        filename = secure_filename(file.filename)
-        temp_path = f"/tmp/{filename}"
-        file.save(temp_path)
+        mask_types = _parse_mask_types(request.form)
         
+        # 解析 PDF（經由暫存檔，自動清理；丟給共用執行緒池限流）
+        # extract_text 以例外回報失敗（沒有 success 欄位）：
+        # 密碼問題回 403、頁數超標回 413，其他解析錯誤回 400
         try:
-            # 解析 PDF
-            parser = PDFParser()
-            result = parser.extract_text(temp_path, password)
-            
-            if not result['success']:
-                return jsonify({
-                    'error': 'PDF 解析失敗',
-                    'details': result.get('error')
-                }), 400
-            
-            # 偵測敏感資訊
-            masker = PrivacyMasker(mask_types=mask_types)
-            sensitive_items = masker.detect(result['text'])
-            
-            # 統計
-            type_counts = {}
-            for item in sensitive_items:
-                type_name = item['type_name']
-                if type_name not in type_counts:
-                    type_counts[type_name] = {
-                        'type': type_name,
-                        'count': 0,
-                        'examples': []
-                    }
-                type_counts[type_name]['count'] += 1
-                if len(type_counts[type_name]['examples']) < 3:
-                    type_counts[type_name]['examples'].append(item['masked'])
-            
-            return jsonify({
+            result = EXECUTOR.submit(_save_and_extract, file, password).result()
+        except PermissionError as e:
+            return ojsonify({'error': 'PDF 加密錯誤', 'details': str(e)}, 403)
+        except ValueError as e:
+            return ojsonify({'error': str(e)}, 413)
+        except Exception as e:
+            return ojsonify({'error': 'PDF 解析失敗', 'details': str(e)}, 400)
+
+        # 空文字 PDF（如純掃描影像）直接回傳零結果，不啟動偵測
+        # （解析器只會收錄有文字的頁面，pages 為空即代表沒有內容）
+        if not result['pages']:
+            return ojsonify({
                 'success': True,
-                'sensitive_count': len(sensitive_items),
-                'sensitive_items': list(type_counts.values()),
+                'sensitive_count': 0,
+                'sensitive_items': [],
                 'metadata': {
                     'pages': result['total_pages']
                 }
             })
-            
-        finally:
-            # 清理暫存檔案
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-    
+
+        # 偵測敏感資訊（遮罩器依設定快取重複使用，逐頁處理）
+        masker = _get_masker(mask_types=tuple(sorted(mask_types)) if mask_types else tuple(PrivacyMasker.PATTERNS.keys()))
+        sensitive_items = []
+        for page in result['pages']:
+            sensitive_items.extend(masker.detect(page['text']))
+
+        # 統計（Counter 計數 + 每類型最多三個範例）
+        counts = Counter(item['type_name'] for item in sensitive_items)
+        examples = defaultdict(list)
+        for item in sensitive_items:
+            type_examples = examples[item['type_name']]
+            if len(type_examples) < 3:
+                type_examples.append(item['masked'])
+
+        return ojsonify({
+            'success': True,
+            'sensitive_count': len(sensitive_items),
+            'sensitive_items': [
+                {'type': type_name, 'count': count, 'examples': examples[type_name]}
+                for type_name, count in counts.items()
+            ],
+            'metadata': {
+                'pages': result['total_pages']
+            }
+        })
+
+    except RequestEntityTooLarge:
+        # 超過 MAX_CONTENT_LENGTH 在解析表單時才會觸發；
+        # 交給全域 413 handler 回報，不要吞成 500
+        raise
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}, 500)
 
 
 @api_bp.route('/ai/mask-types', methods=['GET'])
@@ -314,8 +469,15 @@ def get_mask_types():
             ]
         }
     """
-    masker = PrivacyMasker()
-    return jsonify({
-        'mask_types': masker.get_mask_types()
-    })
+    global _MASK_TYPES_RESPONSE
+    if _MASK_TYPES_RESPONSE is None:
+        # 首次請求時建立（遮罩類型可能包含從環境變數載入的自訂姓名）
+        masker = _get_masker(mask_types=tuple(PrivacyMasker.PATTERNS.keys()))
+        _MASK_TYPES_RESPONSE = StaticJSONResponse({
+            'mask_types': masker.get_mask_types()
+        })
+    return _MASK_TYPES_RESPONSE.response()
+
+
+_MASK_TYPES_RESPONSE = None
 
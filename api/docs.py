@@ -3,8 +3,10 @@
 提供透過 HTTP 訪問 Markdown 文件的功能
 """
 import os
+from functools import lru_cache
 from pathlib import Path
-from flask import jsonify, render_template_string, send_file, abort
+from typing import Optional
+from flask import jsonify, send_file, abort, current_app
 from . import api_bp
 
 # Markdown 渲染（需要安裝 markdown 套件）
@@ -14,6 +16,19 @@ try:
 except ImportError:
     MARKDOWN_AVAILABLE = False
 
+# 轉換器建立一次重複使用：每次請求重建會重跑整個擴充套件註冊流程
+if MARKDOWN_AVAILABLE:
+    _MD = markdown.Markdown(
+        extensions=[
+            'fenced_code',      # 程式碼區塊
+            'tables',           # 表格
+            'toc',              # 目錄
+            'nl2br',            # 換行
+        ]
+    )
+else:
+    _MD = None
+
 
 # 簡單的 HTML 模板
 HTML_TEMPLATE = """
@@ -331,64 +346,155 @@ INDEX_TEMPLATE = """
 """
 
 
+# 已解析過的文件路徑（成功命中才快取，新文件仍可被找到）
+_RESOLVED_DOCS = {}
+
+
+def _resolve_doc(filename: str) -> Optional[Path]:
+    """
+    找出文件的實際路徑（根目錄或 docs/ 目錄）
+
+    每次請求重查兩個位置要花最多四個 stat 系統呼叫；
+    成功解析過的檔名直接從字典取出，只剩確認檔案仍在的一次 stat。
+
+    Args:
+        filename: 文件檔名（如 README.md）
+
+    Returns:
+        文件路徑；找不到時為 None
+    """
+    cached = _RESOLVED_DOCS.get(filename)
+    if cached is not None:
+        # 檔案可能在快取後被刪除；直接送出去會讓 send_file 炸 500，
+        # 失效的項目移除後重走完整查找（找不到就回 404）
+        if cached.is_file():
+            return cached
+        _RESOLVED_DOCS.pop(filename, None)
+
+    root_dir = Path(__file__).parent.parent
+    possible_paths = [
+        root_dir / filename,           # 根目錄
+        root_dir / 'docs' / filename,  # docs 目錄
+    ]
+
+    for path in possible_paths:
+        if path.exists() and path.is_file():
+            _RESOLVED_DOCS[filename] = path
+            return path
+
+    return None
+
+
+# 編譯後的 Jinja 模板（首次請求時建立，避免每次重新解析 200 行模板字串）
+_INDEX_TMPL = None
+_DOC_TMPL = None
+
+
+def _get_templates():
+    """
+    取得編譯好的 (文件列表, 文件內容) Jinja 模板
+
+    render_template_string 每次請求都會重新解析並編譯模板字串；
+    這裡改用應用的 jinja_env 編譯一次後快取 Template 物件。
+    """
+    global _INDEX_TMPL, _DOC_TMPL
+    if _INDEX_TMPL is None:
+        env = current_app.jinja_env
+        _INDEX_TMPL = env.from_string(INDEX_TEMPLATE)
+        _DOC_TMPL = env.from_string(HTML_TEMPLATE)
+    return _INDEX_TMPL, _DOC_TMPL
+
+
+@lru_cache(maxsize=64)
+def _render_doc(path_str: str, mtime_ns: int) -> str:
+    """
+    讀取並渲染 Markdown 文件（依檔案路徑與 mtime 快取）
+
+    文件很少變動，重複請求直接回傳快取的 HTML；
+    檔案一旦更新，mtime 改變即自動重新渲染。
+
+    Args:
+        path_str: 文件路徑
+        mtime_ns: 檔案修改時間（奈秒，作為快取 key 的一部分）
+
+    Returns:
+        渲染後的 HTML 內容
+    """
+    with open(path_str, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if MARKDOWN_AVAILABLE:
+        # 使用模組層級的轉換器（reset 清掉前一份文件的狀態）
+        return _MD.reset().convert(content)
+
+    # 如果沒有 markdown 套件，顯示純文字
+    return (
+        f'<pre>{content}</pre>'
+        '<div class="warning">⚠️ 未安裝 markdown 套件，顯示原始內容。'
+        '執行 <code>pip install markdown</code> 以啟用格式化顯示。</div>'
+    )
+
+
+# 文件列表（固定設定，不需要每次請求重建）
+_DOCS_INDEX = (
+    {
+        'filename': 'README.md',
+        'title': '專案說明',
+        'description': '快速了解專案功能與使用方式',
+        'icon': '📘',
+    },
+    {
+        'filename': 'QUICKSTART.md',
+        'title': '快速開始',
+        'description': '5 分鐘快速啟動指南',
+        'icon': '🚀',
+    },
+    {
+        'filename': 'HOW_TO_ADD_API.md',
+        'title': 'API 開發指南',
+        'description': '如何新增和擴展 API 端點',
+        'icon': '🔧',
+    },
+    {
+        'filename': 'PDF_TESTING.md',
+        'title': 'PDF 測試指南',
+        'description': '如何測試 PDF 解析功能',
+        'icon': '🧪',
+    },
+    {
+        'filename': 'DEPLOYMENT.md',
+        'title': '部署指南',
+        'description': '各種環境的部署方式',
+        'icon': '☁️',
+    },
+    {
+        'filename': 'FILE_ORGANIZATION.md',
+        'title': '檔案組織',
+        'description': '專案檔案結構說明',
+        'icon': '📁',
+    },
+    {
+        'filename': 'FLASK_PROJECT_STRUCTURES.md',
+        'title': 'Flask 專案結構',
+        'description': 'Flask 最佳實踐與結構演進',
+        'icon': '🏗️',
+    },
+    {
+        'filename': 'CHANGELOG.md',
+        'title': '更新日誌',
+        'description': '版本歷史與變更記錄',
+        'icon': '📝',
+    },
+)
+
+
 @api_bp.route('/docs', methods=['GET'])
 def docs_index():
     """
     文件列表首頁
     顯示所有可用的文件
     """
-    docs = [
-        {
-            'filename': 'README.md',
-            'title': '專案說明',
-            'description': '快速了解專案功能與使用方式',
-            'icon': '📘'
-        },
-        {
-            'filename': 'QUICKSTART.md',
-            'title': '快速開始',
-            'description': '5 分鐘快速啟動指南',
-            'icon': '🚀'
-        },
-        {
-            'filename': 'HOW_TO_ADD_API.md',
-            'title': 'API 開發指南',
-            'description': '如何新增和擴展 API 端點',
-            'icon': '🔧'
-        },
-        {
-            'filename': 'PDF_TESTING.md',
-            'title': 'PDF 測試指南',
-            'description': '如何測試 PDF 解析功能',
-            'icon': '🧪'
-        },
-        {
-            'filename': 'DEPLOYMENT.md',
-            'title': '部署指南',
-            'description': '各種環境的部署方式',
-            'icon': '☁️'
-        },
-        {
-            'filename': 'FILE_ORGANIZATION.md',
-            'title': '檔案組織',
-            'description': '專案檔案結構說明',
-            'icon': '📁'
-        },
-        {
-            'filename': 'FLASK_PROJECT_STRUCTURES.md',
-            'title': 'Flask 專案結構',
-            'description': 'Flask 最佳實踐與結構演進',
-            'icon': '🏗️'
-        },
-        {
-            'filename': 'CHANGELOG.md',
-            'title': '更新日誌',
-            'description': '版本歷史與變更記錄',
-            'icon': '📝'
-        },
-    ]
-    
-    return render_template_string(INDEX_TEMPLATE, docs=docs)
+    return _get_templates()[0].render(docs=_DOCS_INDEX)
 
 
 @api_bp.route('/docs/<path:filename>', methods=['GET'])
@@ -408,53 +514,23 @@ def view_doc(filename):
         }), 400
     
     # 檢查檔案位置（支援根目錄和 docs/ 目錄）
-    root_dir = Path(__file__).parent.parent
-    possible_paths = [
-        root_dir / filename,           # 根目錄
-        root_dir / 'docs' / filename,  # docs 目錄
-    ]
-    
-    doc_path = None
-    for path in possible_paths:
-        if path.exists() and path.is_file():
-            doc_path = path
-            break
-    
+    doc_path = _resolve_doc(filename)
     if not doc_path:
         abort(404)
-    
-    # 讀取檔案
+
+    # 讀取並渲染（以 (路徑, mtime) 為 key 快取，文件更新時自動失效）
     try:
-        with open(doc_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        html_content = _render_doc(str(doc_path), doc_path.stat().st_mtime_ns)
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': f'讀取檔案失敗: {str(e)}'
         }), 500
-    
-    # 渲染 Markdown
-    if MARKDOWN_AVAILABLE:
-        # 使用 markdown 套件渲染
-        html_content = markdown.markdown(
-            content,
-            extensions=[
-                'fenced_code',      # 程式碼區塊
-                'tables',           # 表格
-                'toc',              # 目錄
-                'nl2br',            # 換行
-            ]
-        )
-    else:
-        # 如果沒有 markdown 套件，顯示純文字
-        html_content = f'<pre>{content}</pre>'
-        html_content += '<div class="warning">⚠️ 未安裝 markdown 套件，顯示原始內容。執行 <code>pip install markdown</code> 以啟用格式化顯示。</div>'
-    
+
     # 取得標題
     title = filename.replace('.md', '').replace('_', ' ').title()
     
-    return render_template_string(
-        HTML_TEMPLATE,
+    return _get_templates()[1].render(
         title=title,
         content=html_content
     )
@@ -474,25 +550,15 @@ def raw_doc(filename):
             'message': '只支援 Markdown 檔案'
         }), 400
     
-    root_dir = Path(__file__).parent.parent
-    possible_paths = [
-        root_dir / filename,
-        root_dir / 'docs' / filename,
-    ]
-    
-    doc_path = None
-    for path in possible_paths:
-        if path.exists() and path.is_file():
-            doc_path = path
-            break
-    
+    doc_path = _resolve_doc(filename)
     if not doc_path:
         abort(404)
-    
+
     return send_file(
         doc_path,
         mimetype='text/markdown',
         as_attachment=True,
-        download_name=filename
+        download_name=filename,
+        conditional=True  # 支援 If-Modified-Since / Range，未變動時回 304
     )
 
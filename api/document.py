@@ -3,54 +3,58 @@
 """
 from flask import jsonify
 from . import api_bp
+from ._responses import StaticJSONResponse
+
+# 支援的文件類型（固定設定，序列化一次重複使用）
+DOCUMENT_TYPES = {
+    'bank_statement': {
+        'name': '銀行對帳單',
+        'description': '銀行定期提供的帳戶交易明細',
+        'extracted_fields': [
+            'account_number',
+            'opening_balance',
+            'closing_balance',
+            'transactions'
+        ]
+    },
+    'credit_card': {
+        'name': '信用卡帳單',
+        'description': '信用卡的每月消費帳單',
+        'extracted_fields': [
+            'card_number',
+            'due_date',
+            'total_amount_due',
+            'minimum_payment',
+            'transactions'
+        ]
+    },
+    'transaction_notice': {
+        'name': '交易通知',
+        'description': '單筆交易的即時通知',
+        'extracted_fields': [
+            'transaction_date',
+            'merchant',
+            'amount',
+            'transaction_type'
+        ]
+    }
+}
+
+_TYPES_RESPONSE = StaticJSONResponse({
+    'status': 'success',
+    'data': DOCUMENT_TYPES
+})
 
 
 @api_bp.route('/documents/types', methods=['GET'])
 def get_document_types():
     """
     取得支援的文件類型列表
-    
+
     Returns:
         JSON: 文件類型清單
     """
-    document_types = {
-        'bank_statement': {
-            'name': '銀行對帳單',
-            'description': '銀行定期提供的帳戶交易明細',
-            'extracted_fields': [
-                'account_number',
-                'opening_balance',
-                'closing_balance',
-                'transactions'
-            ]
-        },
-        'credit_card': {
-            'name': '信用卡帳單',
-            'description': '信用卡的每月消費帳單',
-            'extracted_fields': [
-                'card_number',
-                'due_date',
-                'total_amount_due',
-                'minimum_payment',
-                'transactions'
-            ]
-        },
-        'transaction_notice': {
-            'name': '交易通知',
-            'description': '單筆交易的即時通知',
-            'extracted_fields': [
-                'transaction_date',
-                'merchant',
-                'amount',
-                'transaction_type'
-            ]
-        }
-    }
-    
-    return jsonify({
-        'status': 'success',
-        'data': document_types
-    })
+    return _TYPES_RESPONSE.response()
 
 
 @api_bp.route('/documents/stats', methods=['GET'])
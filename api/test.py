@@ -2,12 +2,17 @@
 測試用 API
 提供 PDF 解析測試的 HTTP 介面
 """
-import os
-from flask import jsonify, request, current_app
+import hashlib
+from flask import Response, jsonify, request, current_app
 from werkzeug.utils import secure_filename
 from . import api_bp
-from utils.pdf_parser import PDFParser
-from utils.document_processor import DocumentProcessor
+from ._executor import EXECUTOR
+from ._pdf_cache import (extract_cached_bytes, get_cached, open_spilled_text,
+                         spill_text)
+from utils.pdf_parser import get_thread_parser
+
+# 串流回應的分塊大小
+_STREAM_CHUNK = 64 * 1024
 
 
 @api_bp.route('/test/parse-pdf', methods=['POST'])
@@ -40,67 +45,75 @@ def test_parse_pdf():
         # 獲取密碼（如果有）
         pdf_password = request.form.get('password', '')
         
-        # 儲存檔案
+        # 一次讀入記憶體解析，不經過磁碟
         filename = secure_filename(file.filename)
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-        
-        # 解析 PDF
-        parser = PDFParser()
+        pdf_bytes = file.read()
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+
+        # 解析 PDF（內容相同的檔案直接使用快取結果）
+        parser = get_thread_parser()
         try:
-            result = parser.extract_text(filepath, pdf_password or None)
+            result = extract_cached_bytes(parser, pdf_bytes, pdf_password or None,
+                                          digest=digest)
         except PermissionError as e:
-            # 清理檔案
-            os.remove(filepath)
-            
             return jsonify({
                 'status': 'error',
                 'message': str(e),
                 'error_code': 'PDF_ENCRYPTED',
                 'hint': '這個 PDF 有密碼保護。請在 password 參數中提供密碼。'
             }), 403
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'error_code': 'PDF_TOO_MANY_PAGES'
+            }), 413
         
         # 提取額外資訊
         text = result['text']
+
+        # full_text_url 的後續 GET 在多 worker 部署下不一定落在
+        # 這個行程；把全文寫進跨行程共用的備援區（交給執行緒池，
+        # 不佔用請求延遲），讓任何 worker 都能供應
+        EXECUTOR.submit(spill_text, digest, pdf_password or None, text)
         numbers = parser.extract_numbers(text)
         dates = parser.extract_dates(text)
         amounts = parser.extract_amounts(text)
-        
-        # 刪除檔案
-        os.remove(filepath)
-        
+
         # 返回結果
+        # 完整文字可能有數百 KB，預設不附在回應中；
+        # include_full_text=1 可附上，或透過 full_text_url 以串流取得
+        data = {
+            'filename': filename,
+            'total_pages': result['total_pages'],
+            'text_length': len(text),
+            # 切片即可，不做字串串接；截斷與否由 preview_truncated 標示，
+            # 需要省略號的客戶端自行補上
+            'text_preview': text[:500],
+            'preview_truncated': len(text) > 500,
+            'full_text_url': f'/api/test/parse-pdf/full-text/{digest}',
+            'metadata': result['metadata'],
+            'extracted': {
+                'numbers': numbers[:20],  # 前 20 個數字
+                'dates': dates[:20],      # 前 20 個日期
+                'amounts': {
+                    'all': amounts['all_amounts'][:20],
+                    'totals': amounts['totals'],
+                    'balances': amounts['balances']
+                }
+            },
+            'pages': result['pages_meta']
+        }
+
+        if request.args.get('include_full_text') == '1':
+            data['full_text'] = text
+
         return jsonify({
             'status': 'success',
             'message': '解析完成',
-            'data': {
-                'filename': filename,
-                'total_pages': result['total_pages'],
-                'text_length': len(text),
-                'text_preview': text[:500] + '...' if len(text) > 500 else text,
-                'full_text': text,  # 完整文字
-                'metadata': result['metadata'],
-                'extracted': {
-                    'numbers': numbers[:20],  # 前 20 個數字
-                    'dates': dates[:20],      # 前 20 個日期
-                    'amounts': {
-                        'all': amounts['all_amounts'][:20],
-                        'totals': amounts['totals'],
-                        'balances': amounts['balances']
-                    }
-                },
-                'pages': [
-                    {
-                        'page_number': p['page_number'],
-                        'text_length': len(p['text']),
-                        'size': f"{p['width']:.1f}x{p['height']:.1f}"
-                    }
-                    for p in result['pages']
-                ]
-            }
+            'data': data
         }), 200
-        
+
     except Exception as e:
         current_app.logger.error(f'解析 PDF 時發生錯誤: {str(e)}')
         return jsonify({
@@ -109,6 +122,56 @@ def test_parse_pdf():
         }), 500
 
 
+@api_bp.route('/test/parse-pdf/full-text/<digest>', methods=['GET'])
+def test_full_text(digest):
+    """
+    以串流取得已解析 PDF 的完整文字
+
+    parse-pdf 回應中的 full_text_url 指向這裡；文字從解析快取讀出，
+    以 64KB 分塊串流，不會在記憶體中組出完整的 JSON 回應。
+    行程內快取未命中時（多 worker 部署下 GET 落在其他 worker），
+    改從跨行程共用的全文備援區供應。
+
+    Args:
+        digest: parse-pdf 回傳的內容雜湊
+
+    Query:
+        password: 解析時使用的 PDF 密碼（選填）
+
+    Returns:
+        text/plain 串流；快取與備援區都沒有該結果時回 404
+    """
+    password = request.args.get('password') or None
+    result = get_cached(digest, password)
+
+    if result is not None:
+        text = result['text']
+
+        def generate():
+            for start in range(0, len(text), _STREAM_CHUNK):
+                yield text[start:start + _STREAM_CHUNK]
+
+        return Response(generate(), mimetype='text/plain')
+
+    # 其他 worker 解析的結果從備援檔逐塊串流
+    spilled = open_spilled_text(digest, password)
+    if spilled is None:
+        return jsonify({
+            'status': 'error',
+            'message': '找不到該解析結果（請先呼叫 parse-pdf）'
+        }), 404
+
+    def generate_from_file():
+        with spilled:
+            while True:
+                chunk = spilled.read(_STREAM_CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+
+    return Response(generate_from_file(), mimetype='text/plain')
+
+
 @api_bp.route('/test/process-document', methods=['POST'])
 def test_process_document():
     """
@@ -141,29 +204,30 @@ def test_process_document():
         # 獲取密碼（如果有）
         pdf_password = request.form.get('password', '')
         
-        # 儲存檔案
+        # 一次讀入記憶體解析，不經過磁碟
         filename = secure_filename(file.filename)
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-        
-        # 解析 PDF
-        parser = PDFParser()
+        pdf_bytes = file.read()
+
+        # 解析 PDF（內容相同的檔案直接使用快取結果）
+        parser = get_thread_parser()
         try:
-            pdf_content = parser.extract_text(filepath, pdf_password or None)
+            pdf_content = extract_cached_bytes(parser, pdf_bytes, pdf_password or None)
         except PermissionError as e:
-            # 清理檔案
-            os.remove(filepath)
-            
             return jsonify({
                 'status': 'error',
                 'message': str(e),
                 'error_code': 'PDF_ENCRYPTED',
                 'hint': '這個 PDF 有密碼保護。請在 password 參數中提供密碼。'
             }), 403
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'error_code': 'PDF_TOO_MANY_PAGES'
+            }), 413
         
-        # 處理文件
-        processor = DocumentProcessor()
+        # 處理文件（create_app 初始化的共用實例）
+        processor = current_app.extensions['doc_processor']
         result = processor.process_document(
             document_type=document_type,
             content=pdf_content,
@@ -172,10 +236,7 @@ def test_process_document():
                 'test_mode': True
             }
         )
-        
-        # 刪除檔案
-        os.remove(filepath)
-        
+
         # 返回結果
         return jsonify({
             'status': 'success',
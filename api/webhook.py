@@ -2,15 +2,110 @@
 Webhook 相關 API
 處理來自 Gmail Apps Script 的請求
 """
+import hashlib
+import json
 import os
+import re
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
 from flask import request, jsonify, current_app
-from werkzeug.utils import secure_filename
 from . import api_bp
-from utils.pdf_parser import PDFParser
-from utils.document_processor import DocumentProcessor
-from utils.privacy_masker import PrivacyMasker
+from ._executor import EXECUTOR
+from ._pdf_cache import extract_cached_bytes
+from utils.pdf_parser import get_thread_parser
 from utils.extraction_manager import ExtractionManager
 
+# 背景處理工作：job_id -> Future（結果領取後即移除）。
+# 這張表是行程內的；gunicorn 多 worker 部署時 result_url 的 GET
+# 不一定落在受理的 worker，因此工作狀態與完成結果同時寫進所有
+# worker 都讀得到的共用目錄，本表只作為同 worker 的快速路徑
+_JOBS = OrderedDict()
+_JOBS_MAX = 256
+_jobs_lock = threading.Lock()
+
+_JOB_DIR = os.getenv('WEBHOOK_JOB_DIR') or os.path.join(
+    tempfile.gettempdir(), 'task_service_jobs'
+)
+_JOB_DIR_MAX = int(os.getenv('WEBHOOK_JOB_FILES', '256'))
+
+# job_id 來自 URL，先驗證格式再拿去組檔案路徑
+_JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+
+def _job_path(job_id):
+    return os.path.join(_JOB_DIR, f'{job_id}.json')
+
+
+def _write_job(job_id, record):
+    """原子寫入工作記錄（暫存檔 + os.replace，不會讀到半寫入內容）"""
+    path = _job_path(job_id)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _mark_job_pending(job_id):
+    """受理時先放 pending 標記，其他 worker 查詢會回 202 而非 404"""
+    try:
+        os.makedirs(_JOB_DIR, mode=0o700, exist_ok=True)
+        _write_job(job_id, {'pending': True})
+
+        # 沒被領取的舊工作依時間淘汰，目錄不無限成長
+        entries = [
+            os.path.join(_JOB_DIR, name)
+            for name in os.listdir(_JOB_DIR)
+            if name.endswith('.json')
+        ]
+        if len(entries) > _JOB_DIR_MAX:
+            entries.sort(key=os.path.getmtime)
+            for stale in entries[:len(entries) - _JOB_DIR_MAX]:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+    except OSError:
+        pass  # 共用目錄寫不進去時退回單 worker 行為
+
+
+def _store_job_result(job_id, future):
+    """完成回呼：把結果寫進共用目錄，任何 worker 都能供應"""
+    try:
+        payload, status_code = future.result()
+    except Exception as e:
+        payload, status_code = {
+            'status': 'error',
+            'message': f'處理失敗: {str(e)}'
+        }, 500
+    try:
+        _write_job(job_id, {'payload': payload, 'status_code': status_code})
+    except OSError:
+        pass
+
+
+def _read_job(job_id):
+    """讀取共用目錄中的工作記錄；沒有或格式不對時為 None"""
+    if not _JOB_ID_RE.fullmatch(job_id):
+        return None
+    try:
+        with open(_job_path(job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _claim_job(job_id):
+    """領取後移除共用目錄中的記錄"""
+    try:
+        os.remove(_job_path(job_id))
+    except OSError:
+        pass
+
+# 部署後不會變動的設定在載入時解析一次，不必每個請求查環境變數
+_PERSIST_UPLOADS = os.getenv('PERSIST_UPLOADS', '0') == '1'
+
 
 def allowed_file(filename):
     """檢查檔案類型是否允許"""
@@ -18,6 +113,137 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _persist_upload(app, filepath, pdf_bytes):
+    """寫入附件留存副本（由執行緒池執行，與 PDF 解析重疊進行）"""
+    try:
+        with open(filepath, 'wb') as f:
+            f.write(pdf_bytes)
+    except OSError as e:
+        app.logger.error(f'留存附件失敗 {filepath}: {str(e)}')
+
+
+def _process_gmail_pdf(app, pdf_bytes, filename, document_type, sender,
+                       subject, email_date, pdf_password, mask_privacy,
+                       use_structured):
+    """
+    Gmail webhook 的完整處理流程（解析 → 遮罩 → 提取）
+
+    附件內容以 bytes 傳入，全程在記憶體中處理，不經過磁碟。
+    同步請求直接呼叫；背景工作則由執行緒池執行，
+    因此不依賴 request context，只透過參數與 app context 運作。
+
+    Returns:
+        (回應內容 dict, HTTP 狀態碼)
+    """
+    with app.app_context():
+        try:
+            # 解析 PDF（內容相同的附件直接使用快取結果）
+            try:
+                pdf_content = extract_cached_bytes(
+                    get_thread_parser(), pdf_bytes, pdf_password or None
+                )
+            except PermissionError as e:
+                return {
+                    'status': 'error',
+                    'message': str(e),
+                    'error_code': 'PDF_ENCRYPTED',
+                    'hint': '請在 password 參數中提供 PDF 密碼'
+                }, 403
+            except ValueError as e:
+                return {
+                    'status': 'error',
+                    'message': str(e),
+                    'error_code': 'PDF_TOO_MANY_PAGES'
+                }, 413
+
+            # 遮罩個資（如果需要）
+            mask_info = None
+            text_to_process = pdf_content['text']
+
+            if mask_privacy:
+                masker = app.extensions['privacy_masker']
+                mask_result = masker.mask(text_to_process)
+                text_to_process = mask_result.masked
+                mask_info = {
+                    'masked_count': mask_result.mask_count,
+                    'sensitive_types': list(set(item['type_name'] for item in mask_result.sensitive_items))
+                }
+
+            # 選擇處理方式
+            if use_structured:
+                # 使用新的結構化提取
+                extractor = ExtractionManager(enable_ai_fallback=False)
+                extraction_metadata = {
+                    'filename': filename,
+                    'total_pages': pdf_content.get('total_pages'),
+                    'sender': sender,
+                    'subject': subject,
+                    'date': email_date
+                }
+
+                extraction_result = extractor.extract(
+                    text_to_process,
+                    metadata=extraction_metadata,
+                    validate=True
+                )
+
+                if extraction_result['success']:
+                    result = {
+                        'status': 'success',
+                        'message': '文件處理完成（結構化提取）',
+                        'data': extraction_result['data'],
+                        'extraction_method': extraction_result['method'],
+                        'validation': extraction_result.get('validation')
+                    }
+                else:
+                    # 結構化提取失敗，fallback 到舊方法
+                    app.logger.warning(f"結構化提取失敗，使用傳統方法: {extraction_result.get('errors')}")
+                    processor = app.extensions['doc_processor']
+                    result = processor.process_document(
+                        document_type=document_type,
+                        content=pdf_content,
+                        metadata=extraction_metadata
+                    )
+                    result = {
+                        'status': 'success',
+                        'message': '文件處理完成（傳統方法）',
+                        'data': result,
+                        'extraction_method': 'legacy',
+                        'extraction_errors': extraction_result.get('errors')
+                    }
+            else:
+                # 使用舊的處理器
+                processor = app.extensions['doc_processor']
+                result = processor.process_document(
+                    document_type=document_type,
+                    content=pdf_content,
+                    metadata={
+                        'sender': sender,
+                        'subject': subject,
+                        'date': email_date,
+                        'filename': filename
+                    }
+                )
+                result = {
+                    'status': 'success',
+                    'message': '文件處理完成',
+                    'data': result
+                }
+
+            # 加入遮罩資訊
+            if mask_info:
+                result['privacy_masking'] = mask_info
+
+            return result, 200
+
+        except Exception as e:
+            app.logger.error(f'處理請求時發生錯誤: {str(e)}')
+            return {
+                'status': 'error',
+                'message': f'處理失敗: {str(e)}'
+            }, 500
+
+
 @api_bp.route('/webhook/gmail', methods=['POST'])
 def gmail_webhook():
     """
@@ -41,23 +267,23 @@ def gmail_webhook():
                 'status': 'error',
                 'message': '未提供 PDF 檔案'
             }), 400
-        
+
         file = request.files['file']
-        
+
         # 檢查檔案名稱
         if file.filename == '':
             return jsonify({
                 'status': 'error',
                 'message': '檔案名稱為空'
             }), 400
-        
+
         # 檢查檔案類型
         if not allowed_file(file.filename):
             return jsonify({
                 'status': 'error',
                 'message': '只接受 PDF 檔案'
             }), 400
-        
+
         # 獲取表單參數
         document_type = request.form.get('document_type', 'unknown')
         sender = request.form.get('sender', '')
@@ -66,114 +292,57 @@ def gmail_webhook():
         pdf_password = request.form.get('password', '')  # PDF 密碼（選填）
         mask_privacy = request.form.get('mask_privacy', 'false').lower() == 'true'  # 是否遮罩個資
         use_structured = request.form.get('structured', 'true').lower() == 'true'  # 是否使用結構化提取（預設啟用）
-        
-        # 儲存檔案
-        filename = secure_filename(file.filename)
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-        
-        # 解析 PDF
-        pdf_parser = PDFParser()
-        try:
-            pdf_content = pdf_parser.extract_text(filepath, pdf_password or None)
-        except PermissionError as e:
-            # 清理檔案
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            
-            return jsonify({
-                'status': 'error',
-                'message': str(e),
-                'error_code': 'PDF_ENCRYPTED',
-                'hint': '請在 password 參數中提供 PDF 密碼'
-            }), 403
-        
-        # 遮罩個資（如果需要）
-        mask_info = None
-        text_to_process = pdf_content['text']
-        
-        if mask_privacy:
-            masker = PrivacyMasker()
-            mask_result = masker.mask(text_to_process)
-            text_to_process = mask_result.masked
-            mask_info = {
-                'masked_count': mask_result.mask_count,
-                'sensitive_types': list(set(item['type_name'] for item in mask_result.sensitive_items))
-            }
-        
-        # 選擇處理方式
-        if use_structured:
-            # 使用新的結構化提取
-            extractor = ExtractionManager(enable_ai_fallback=False)
-            extraction_metadata = {
-                'filename': filename,
-                'total_pages': pdf_content.get('total_pages'),
-                'sender': sender,
-                'subject': subject,
-                'date': email_date
-            }
-            
-            extraction_result = extractor.extract(
-                text_to_process,
-                metadata=extraction_metadata,
-                validate=True
+        run_async = request.form.get('async', 'false').lower() == 'true'  # 是否背景處理
+
+        # 一次讀入記憶體處理，預設不落地；需要留存附件時
+        # 設定 PERSIST_UPLOADS=1 另外寫一份到 UPLOAD_FOLDER
+        filename = file.filename
+        pdf_bytes = file.read()
+
+        app = current_app._get_current_object()
+
+        # 留存副本交給執行緒池寫入，磁碟 I/O 與接下來的解析重疊進行，
+        # 不佔用請求執行緒。檔名以內容雜湊命名：不經過 secure_filename
+        # 的正則、同一份附件重寄不會累積重複檔案
+        if _PERSIST_UPLOADS:
+            digest = hashlib.sha256(pdf_bytes).hexdigest()
+            filepath = os.path.join(
+                current_app.config['UPLOAD_FOLDER'], f'{digest}.pdf'
             )
-            
-            if extraction_result['success']:
-                result = {
-                    'status': 'success',
-                    'message': '文件處理完成（結構化提取）',
-                    'data': extraction_result['data'],
-                    'extraction_method': extraction_result['method'],
-                    'validation': extraction_result.get('validation')
-                }
-            else:
-                # 結構化提取失敗，fallback 到舊方法
-                current_app.logger.warning(f"結構化提取失敗，使用傳統方法: {extraction_result.get('errors')}")
-                processor = DocumentProcessor()
-                result = processor.process_document(
-                    document_type=document_type,
-                    content=pdf_content,
-                    metadata=extraction_metadata
-                )
-                result = {
-                    'status': 'success',
-                    'message': '文件處理完成（傳統方法）',
-                    'data': result,
-                    'extraction_method': 'legacy',
-                    'extraction_errors': extraction_result.get('errors')
-                }
-        else:
-            # 使用舊的處理器
-            processor = DocumentProcessor()
-            result = processor.process_document(
-                document_type=document_type,
-                content=pdf_content,
-                metadata={
-                    'sender': sender,
-                    'subject': subject,
-                    'date': email_date,
-                    'filename': filename
-                }
+            EXECUTOR.submit(_persist_upload, app, filepath, pdf_bytes)
+
+        # 背景處理：立即回 202 + job_id，結果由 /webhook/result/<job_id> 領取
+        # （大型 PDF 不會佔住 Apps Script 的 webhook 連線）
+        if run_async:
+            job_id = uuid.uuid4().hex
+            # pending 標記要在提交前寫入，完成回呼才不會被標記覆蓋
+            _mark_job_pending(job_id)
+            future = EXECUTOR.submit(
+                _process_gmail_pdf, app, pdf_bytes, filename, document_type,
+                sender, subject, email_date, pdf_password, mask_privacy,
+                use_structured
+            )
+            future.add_done_callback(
+                lambda f, job_id=job_id: _store_job_result(job_id, f)
             )
-            result = {
-                'status': 'success',
-                'message': '文件處理完成',
-                'data': result
-            }
-        
-        # 加入遮罩資訊
-        if mask_info:
-            result['privacy_masking'] = mask_info
-        
-        # 刪除已處理的檔案（可選）
-        if os.getenv('DELETE_AFTER_PROCESS', 'true').lower() == 'true':
-            os.remove(filepath)
-        
-        # 返回處理結果
-        return jsonify(result), 200
-        
+            with _jobs_lock:
+                _JOBS[job_id] = future
+                while len(_JOBS) > _JOBS_MAX:
+                    _JOBS.popitem(last=False)
+
+            return jsonify({
+                'status': 'queued',
+                'job_id': job_id,
+                'result_url': f'/api/webhook/result/{job_id}'
+            }), 202
+
+        # 同步處理
+        payload, status_code = _process_gmail_pdf(
+            app, pdf_bytes, filename, document_type, sender, subject,
+            email_date, pdf_password, mask_privacy, use_structured
+        )
+        return jsonify(payload), status_code
+
     except Exception as e:
         current_app.logger.error(f'處理請求時發生錯誤: {str(e)}')
         return jsonify({
@@ -182,6 +351,48 @@ def gmail_webhook():
         }), 500
 
 
+@api_bp.route('/webhook/result/<job_id>', methods=['GET'])
+def webhook_result(job_id):
+    """
+    查詢背景處理結果
+
+    Args:
+        job_id: gmail_webhook 回傳的工作編號
+
+    Returns:
+        JSON: 處理結果；尚未完成時回 202
+    """
+    with _jobs_lock:
+        future = _JOBS.get(job_id)
+
+    if future is not None:
+        if not future.done():
+            return jsonify({'status': 'processing', 'job_id': job_id}), 202
+
+        # 結果領取後即移除（含共用目錄中的副本）
+        with _jobs_lock:
+            _JOBS.pop(job_id, None)
+        _claim_job(job_id)
+
+        payload, status_code = future.result()
+        return jsonify(payload), status_code
+
+    # 本行程不認得這個工作：可能由其他 worker 受理，查共用目錄
+    record = _read_job(job_id)
+
+    if record is None:
+        return jsonify({
+            'status': 'error',
+            'message': '找不到該工作（可能已領取或已過期）'
+        }), 404
+
+    if record.get('pending'):
+        return jsonify({'status': 'processing', 'job_id': job_id}), 202
+
+    _claim_job(job_id)
+    return jsonify(record['payload']), record['status_code']
+
+
 @api_bp.route('/webhook/test', methods=['POST'])
 def test_webhook():
     """
@@ -6,13 +6,37 @@ Task Service API - Gmail Webhook 財務文件處理服務
 """
 import os
 from flask import Flask, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+# orjson 序列化（需要安裝 orjson 套件，未安裝時沿用 Flask 預設）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # 載入環境變數
 load_dotenv()
 
 
+class OrjsonProvider(JSONProvider):
+    """
+    以 orjson 取代 Flask 預設 JSON 序列化
+
+    jsonify 的回應（full_text、pages、AI 分析結果）常有數百 KB 的
+    中文內容，orjson 直接輸出 UTF-8 bytes，比標準庫編碼器快數倍，
+    且所有呼叫端不需修改。
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 def create_app():
     """
     應用程式工廠模式
@@ -27,18 +51,32 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
     app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', './uploads')
-    
+
+    # JSON 序列化改用 orjson
+    if ORJSON_AVAILABLE:
+        app.json = OrjsonProvider(app)
+
     # 啟用 CORS
     CORS(app)
     
-    # 確保上傳資料夾存在
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    
+    # 上傳已全程在記憶體中處理，只有開啟留存副本時才需要上傳資料夾
+    if os.getenv('PERSIST_UPLOADS', '0') == '1':
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
     # ========== 註冊 Blueprint ==========
     # 所有 /api/* 的路由都在 api/ 資料夾中定義
     from api import api_bp
     app.register_blueprint(api_bp)
-    
+
+    # ========== 共用處理器 ==========
+    # 初始化一次、所有請求共用，不必每個請求重新編譯正則與查表
+    # （兩者的處理方法都不修改實例狀態，可跨執行緒共用；
+    # PDFParser 會寫入 self.pages，改用 utils.pdf_parser.get_thread_parser）
+    from utils.document_processor import DocumentProcessor
+    from utils.privacy_masker import PrivacyMasker
+    app.extensions['doc_processor'] = DocumentProcessor()
+    app.extensions['privacy_masker'] = PrivacyMasker()
+
     # ========== 根路由 ==========
     @app.route('/', methods=['GET'])
     def index():
@@ -69,10 +107,11 @@ def create_app():
     # ========== 全域錯誤處理 ==========
     @app.errorhandler(413)
     def too_large(e):
-        """檔案過大錯誤處理"""
+        """檔案過大錯誤處理（上限依實際配置回報）"""
+        max_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
         return jsonify({
             'status': 'error',
-            'message': '檔案大小超過限制（最大 16MB）'
+            'message': f'檔案大小超過限制（最大 {max_mb}MB）'
         }), 413
     
     @app.errorhandler(404)
@@ -105,6 +144,11 @@ def create_app():
 
 
 # ========== 應用程式入口 ==========
+# 這裡的 Werkzeug 開發伺服器只供本機開發；正式環境請用 gunicorn
+# 多工啟動（設定見 gunicorn.conf.py）：
+#
+#     gunicorn -c gunicorn.conf.py "app:create_app()"
+#
 if __name__ == '__main__':
     # 建立應用實例
     app = create_app()
@@ -121,6 +165,7 @@ if __name__ == '__main__':
     print(f"🔧 除錯模式: {'開啟' if debug else '關閉'}")
     print(f"📂 上傳目錄: {app.config['UPLOAD_FOLDER']}")
     print("📦 架構模式: 模組化 (Blueprint)")
+    print("⚠️  開發伺服器模式（正式環境請用 gunicorn -c gunicorn.conf.py \"app:create_app()\"）")
     print("=" * 60)
     print("📚 可用端點:")
     print("   - GET  /                    (服務資訊)")
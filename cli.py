@@ -30,21 +30,35 @@ import os
 import sys
 import json
 import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 
-# 載入環境變數（.env 檔案）
-load_dotenv()
+# orjson 序列化（需要安裝 orjson 套件，未安裝時退回標準庫 json）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 載入環境變數（.env 檔案）；批次模式的工作行程繼承父行程環境，
+# 看到旗標就不再重新解析 .env
+if not os.getenv('_DOTENV_LOADED'):
+    load_dotenv()
+    os.environ['_DOTENV_LOADED'] = '1'
 
 # 添加專案根目錄到 path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from utils.pdf_parser import PDFParser
+from utils import pdf_parser as pdf_parser_module
+from utils.pdf_parser import get_thread_parser
 from utils.privacy_masker import PrivacyMasker
-from utils.ai_integrator import AIIntegrator, AIProvider
-from utils.schema_validator import SchemaValidator
-from utils.extraction_manager import ExtractionManager
+
+# AIIntegrator / SchemaValidator / ExtractionManager 移到各 cmd_* 內
+# 延遲載入：parse、mask 等快速路徑不必付這些模組的 import 成本
 
 
 class Colors:
@@ -59,31 +73,90 @@ class Colors:
     BOLD = '\033[1m'
 
 
+# stdout 導到檔案或管線時改為緩衝輸出：整個指令的訊息累積起來
+# 一次寫出，不必每行一個 write + flush 系統呼叫；互動終端機
+# 維持逐行即時輸出，進度訊息才看得到
+_BUF = []
+_BUFFERED = not sys.stdout.isatty()
+
+
+def _print(text):
+    """輸出一行（緩衝模式下先累積，_flush 時一次寫出）"""
+    if _BUFFERED:
+        _BUF.append(text)
+    else:
+        print(text)
+
+
+def _flush():
+    """把緩衝的輸出一次寫出"""
+    if _BUF:
+        sys.stdout.write('\n'.join(_BUF) + '\n')
+        _BUF.clear()
+
+
+# 常用的 ANSI 片段在 import 時組好，print_* 每次呼叫只剩一次插值
+_HEADER_BAR = f"{Colors.BOLD}{Colors.BLUE}{'=' * 60}{Colors.RESET}"
+_HDR_TEXT_PFX = f"{Colors.BOLD}{Colors.CYAN}"
+_SUCCESS_PFX = f"{Colors.GREEN}✓ "
+_ERROR_PFX = f"{Colors.RED}✗ "
+_WARNING_PFX = f"{Colors.YELLOW}⚠ "
+_INFO_PFX = f"{Colors.CYAN}ℹ "
+
+
 def print_header(text):
     """印出標題"""
-    print(f"\n{Colors.BOLD}{Colors.BLUE}{'=' * 60}{Colors.RESET}")
-    print(f"{Colors.BOLD}{Colors.CYAN}{text}{Colors.RESET}")
-    print(f"{Colors.BOLD}{Colors.BLUE}{'=' * 60}{Colors.RESET}\n")
+    _print(f"\n{_HEADER_BAR}\n{_HDR_TEXT_PFX}{text}{Colors.RESET}\n{_HEADER_BAR}\n")
 
 
 def print_success(text):
     """印出成功訊息"""
-    print(f"{Colors.GREEN}✓ {text}{Colors.RESET}")
+    _print(f"{_SUCCESS_PFX}{text}{Colors.RESET}")
 
 
 def print_error(text):
     """印出錯誤訊息"""
-    print(f"{Colors.RED}✗ {text}{Colors.RESET}")
+    _print(f"{_ERROR_PFX}{text}{Colors.RESET}")
 
 
 def print_warning(text):
     """印出警告訊息"""
-    print(f"{Colors.YELLOW}⚠ {text}{Colors.RESET}")
+    _print(f"{_WARNING_PFX}{text}{Colors.RESET}")
 
 
 def print_info(text):
     """印出資訊"""
-    print(f"{Colors.CYAN}ℹ {text}{Colors.RESET}")
+    _print(f"{_INFO_PFX}{text}{Colors.RESET}")
+
+
+def parse_json_content(content):
+    """
+    嘗試把 AI 回應解析為 JSON
+
+    先看第一個非空白字元，不像 JSON 的內容直接跳過，
+    不浪費一次完整的解析嘗試。
+
+    Args:
+        content: AI 回應文字
+
+    Returns:
+        解析後的物件；不是 JSON 時為 None
+    """
+    if content.lstrip()[:1] not in ('{', '['):
+        return None
+    try:
+        if ORJSON_AVAILABLE:
+            return orjson.loads(content)
+        return json.loads(content)
+    except (json.JSONDecodeError, ValueError):
+        return None
+
+
+def dump_json_pretty(obj) -> str:
+    """以縮排格式序列化（orjson 為 C-level 單趟，未安裝時退回標準庫）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2)
 
 
 def save_output(content, output_file, file_type="txt"):
@@ -93,10 +166,16 @@ def save_output(content, output_file, file_type="txt"):
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         if file_type == "json":
-            with open(output_path, 'w', encoding='utf-8') as f:
-                if isinstance(content, str):
+            if isinstance(content, str):
+                with open(output_path, 'w', encoding='utf-8') as f:
                     f.write(content)
-                else:
+            elif ORJSON_AVAILABLE:
+                # 一次 C-level 序列化直接寫出 bytes，
+                # 不在 Python 層組出完整字串
+                with open(output_path, 'wb') as f:
+                    f.write(orjson.dumps(content, option=orjson.OPT_INDENT_2))
+            else:
+                with open(output_path, 'w', encoding='utf-8') as f:
                     json.dump(content, f, ensure_ascii=False, indent=2)
         else:
             with open(output_path, 'w', encoding='utf-8') as f:
@@ -109,16 +188,76 @@ def save_output(content, output_file, file_type="txt"):
         return False
 
 
+def _stat_or_error(path):
+    """
+    檢查輸入檔案並回傳 stat 結果
+
+    一次 stat 同時涵蓋「檔案存在」與「不是空檔」兩個檢查，
+    不必 os.path.exists 之後又讓解析器再 stat 一次。
+
+    Args:
+        path: 檔案路徑
+
+    Returns:
+        os.stat_result；檔案不存在或為空時印出錯誤並回傳 None
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        print_error(f"檔案不存在: {path}")
+        return None
+
+    if st.st_size == 0:
+        print_error(f"檔案是空的: {path}")
+        return None
+
+    return st
+
+
+# provider 名稱對應表：配合延遲載入，第一次用到才 import 並建表
+_PROVIDER_MAP = None
+
+
+def _get_provider(name):
+    """把 --provider 參數轉成 AIProvider（未知名稱退回 OPENAI）"""
+    global _PROVIDER_MAP
+    if _PROVIDER_MAP is None:
+        from utils.ai_integrator import AIProvider
+        _PROVIDER_MAP = {
+            'openai': AIProvider.OPENAI,
+            'claude': AIProvider.CLAUDE
+        }
+    return _PROVIDER_MAP.get(name, _PROVIDER_MAP['openai'])
+
+
+def _semantic_cache_or_none(args):
+    """--semantic-cache 旗標：建立語意快取；套件未安裝時提示並退回精確快取"""
+    if not getattr(args, 'semantic_cache', False):
+        return None
+    from utils import llm_cache
+    try:
+        return llm_cache.SemanticCache()
+    except ImportError:
+        print_warning("未安裝 sentence-transformers，語意快取停用（僅使用精確快取）")
+        return None
+
+
+def _apply_workers(args):
+    """--workers 參數覆寫解析器的平行行程數（頁數多的 PDF 分頁平行提取）"""
+    if getattr(args, 'workers', None):
+        pdf_parser_module.PDF_WORKERS = args.workers
+
+
 def cmd_parse(args):
     """解析 PDF 文件"""
     print_header(f"📄 解析 PDF: {args.file}")
-    
-    if not os.path.exists(args.file):
-        print_error(f"檔案不存在: {args.file}")
+
+    if _stat_or_error(args.file) is None:
         return 1
-    
+
     try:
-        parser = PDFParser()
+        _apply_workers(args)
+        parser = get_thread_parser()
         result = parser.extract_text(args.file, args.password)
         
         print_success("解析完成")
@@ -128,11 +267,11 @@ def cmd_parse(args):
         if args.output:
             save_output(result['text'], args.output, "txt")
         else:
-            print("\n" + "─" * 60)
-            print(result['text'][:500])  # 顯示前 500 字元
+            _print("\n" + "─" * 60)
+            _print(result['text'][:500])  # 顯示前 500 字元
             if len(result['text']) > 500:
-                print(f"\n... (還有 {len(result['text']) - 500} 個字元)")
-            print("─" * 60)
+                _print(f"\n... (還有 {len(result['text']) - 500} 個字元)")
+            _print("─" * 60)
         
         return 0
         
@@ -140,7 +279,7 @@ def cmd_parse(args):
         print_error(f"PDF 已加密: {e}")
         
         # 檢查是否有載入預設密碼
-        parser = PDFParser()
+        parser = get_thread_parser()
         if parser.default_passwords:
             print_info(f"已嘗試 {len(parser.default_passwords)} 個預設密碼，但都失敗")
             print_warning("請檢查 .env 中的密碼是否正確，或使用 --password 參數手動提供")
@@ -157,13 +296,12 @@ def cmd_mask(args):
     """遮罩個資"""
     print_header(f"🛡️  遮罩個資: {args.file}")
     
-    if not os.path.exists(args.file):
-        print_error(f"檔案不存在: {args.file}")
+    if _stat_or_error(args.file) is None:
         return 1
     
     try:
         # 先解析 PDF
-        parser = PDFParser()
+        parser = get_thread_parser()
         pdf_result = parser.extract_text(args.file, args.password)
         text = pdf_result['text']
         
@@ -174,16 +312,13 @@ def cmd_mask(args):
         
         print_success(f"遮罩完成，共遮罩 {result.mask_count} 項敏感資訊")
         
-        # 顯示敏感資訊統計
+        # 顯示敏感資訊統計（Counter 在 C 層計數，不逐項走 Python 迴圈）
         if result.sensitive_items:
-            type_counts = {}
-            for item in result.sensitive_items:
-                type_name = item['type_name']
-                type_counts[type_name] = type_counts.get(type_name, 0) + 1
-            
+            type_counts = Counter(item['type_name'] for item in result.sensitive_items)
+
             print_info("敏感資訊統計:")
             for type_name, count in type_counts.items():
-                print(f"  - {type_name}: {count} 項")
+                _print(f"  - {type_name}: {count} 項")
         
         # 儲存結果
         if args.output:
@@ -203,7 +338,7 @@ def cmd_mask(args):
         
     except PermissionError as e:
         print_error(f"PDF 已加密: {e}")
-        parser = PDFParser()
+        parser = get_thread_parser()
         if parser.default_passwords:
             print_info(f"已嘗試 {len(parser.default_passwords)} 個預設密碼，但都失敗")
             print_warning("請檢查 .env 中的密碼是否正確，或使用 --password 參數手動提供")
@@ -219,16 +354,24 @@ def cmd_analyze(args):
     """AI 分析文件"""
     print_header(f"🤖 AI 分析: {args.file}")
     
-    if not os.path.exists(args.file):
-        print_error(f"檔案不存在: {args.file}")
+    if _stat_or_error(args.file) is None:
         return 1
     
     try:
+        from utils.ai_integrator import AIIntegrator
+
+        # 先建立 AI 整合器：API 金鑰沒設定時立刻失敗，
+        # 不必等整份 PDF 解析、遮罩完才發現。
+        # temperature=0：提取類任務要可重現的輸出，快取也只對
+        # 決定性輸出生效
+        integrator = AIIntegrator(provider=_get_provider(args.provider), model=args.model,
+                                  temperature=0)
+
         # 解析 PDF
-        parser = PDFParser()
+        parser = get_thread_parser()
         pdf_result = parser.extract_text(args.file, args.password)
         text = pdf_result['text']
-        
+
         # 遮罩個資（如果需要）
         if not args.no_mask:
             print_info("遮罩個資中...")
@@ -236,37 +379,31 @@ def cmd_analyze(args):
             mask_result = masker.mask(text)
             text = mask_result.masked
             print_success(f"已遮罩 {mask_result.mask_count} 項敏感資訊")
-        
+
         # AI 分析
         print_info(f"使用 {args.provider} 進行分析...")
-        
-        provider_map = {
-            'openai': AIProvider.OPENAI,
-            'claude': AIProvider.CLAUDE
-        }
-        
-        provider = provider_map.get(args.provider, AIProvider.OPENAI)
-        integrator = AIIntegrator(provider=provider, model=args.model)
-        
+
         ai_result = integrator.analyze_document(
             text,
             document_type=args.doc_type,
-            instructions=args.instructions
+            instructions=args.instructions,
+            use_cache=not args.no_cache,
+            semantic_cache=_semantic_cache_or_none(args)
         )
         
         if ai_result.success:
             print_success("AI 分析完成")
             
             # 嘗試解析 JSON
-            try:
-                parsed = json.loads(ai_result.content)
-                print("\n" + json.dumps(parsed, ensure_ascii=False, indent=2))
-                
+            parsed = parse_json_content(ai_result.content)
+            if parsed is not None:
+                _print("\n" + dump_json_pretty(parsed))
+
                 if args.output:
                     save_output(parsed, args.output, "json")
-            except json.JSONDecodeError:
-                print("\n" + ai_result.content)
-                
+            else:
+                _print("\n" + ai_result.content)
+
                 if args.output:
                     save_output(ai_result.content, args.output, "txt")
             
@@ -281,7 +418,7 @@ def cmd_analyze(args):
         
     except PermissionError as e:
         print_error(f"PDF 已加密: {e}")
-        parser = PDFParser()
+        parser = get_thread_parser()
         if parser.default_passwords:
             print_info(f"已嘗試 {len(parser.default_passwords)} 個預設密碼，但都失敗")
             print_warning("請檢查 .env 中的密碼是否正確，或使用 --password 參數手動提供")
@@ -297,8 +434,7 @@ def cmd_process(args):
     """完整處理流程"""
     print_header(f"⚙️  完整處理: {args.file}")
     
-    if not os.path.exists(args.file):
-        print_error(f"檔案不存在: {args.file}")
+    if _stat_or_error(args.file) is None:
         return 1
     
     try:
@@ -306,37 +442,72 @@ def cmd_process(args):
         output_dir.mkdir(parents=True, exist_ok=True)
         
         base_name = Path(args.file).stem
-        
-        # 步驟 1: 解析 PDF
+
+        # 步驟 1: 解析 PDF（頁數達門檻時自動分頁平行提取）
         print_info("步驟 1/4: 解析 PDF...")
-        parser = PDFParser()
+        _apply_workers(args)
+        parser = get_thread_parser()
         pdf_result = parser.extract_text(args.file, args.password)
         text = pdf_result['text']
         
+        # 輸出檔彼此獨立，交給小型執行緒池在背景寫出，
+        # 磁碟 IO 與下一步的 CPU 工作重疊（慢速磁碟/網路檔案系統有感）
+        io_pool = ThreadPoolExecutor(max_workers=2)
+        pending = []
+
         original_file = output_dir / f"{base_name}_original.txt"
-        save_output(text, original_file, "txt")
+        pending.append(io_pool.submit(save_output, text, original_file, "txt"))
         print_success("PDF 解析完成")
         
-        # 步驟 2: 遮罩個資
-        print_info("步驟 2/4: 遮罩個資...")
+        # 步驟 2 + 3: 遮罩個資、結構化提取
+        from utils.extraction_manager import ExtractionManager
+
         masker = PrivacyMasker()
-        mask_result = masker.mask(text)
-        
         masked_file = output_dir / f"{base_name}_masked.txt"
-        save_output(mask_result.masked, masked_file, "txt")
-        print_success(f"已遮罩 {mask_result.mask_count} 項敏感資訊")
-        
-        # 步驟 3: 結構化提取
-        print_info("步驟 3/4: 結構化提取...")
         extractor = ExtractionManager(enable_ai_fallback=False)
-        extraction_result = extractor.extract(
-            mask_result.masked,
-            metadata={'filename': args.file},
-            validate=args.validate
-        )
-        
+
+        if args.fuse:
+            # 融合模式：遮罩串流單次掃描，邊寫遮罩檔邊餵給提取器，
+            # 不先組出完整的 MaskResult
+            print_info("步驟 2/4 + 3/4: 遮罩個資並提取（融合）...")
+            sensitive_items = []
+
+            def _mask_and_write():
+                with open(masked_file, 'w', encoding='utf-8') as f:
+                    for kind, chunk in masker.mask_stream(text, sensitive_items):
+                        f.write(chunk)
+                        yield kind, chunk
+
+            extraction_result = extractor.extract_stream(
+                _mask_and_write(),
+                metadata={'filename': args.file},
+                validate=args.validate
+            )
+            mask_count = len(sensitive_items)
+            print_success(f"已儲存至: {masked_file}")
+            print_success(f"已遮罩 {mask_count} 項敏感資訊")
+            masked_text = None  # AI 步驟需要時再從遮罩檔讀回
+        else:
+            print_info("步驟 2/4: 遮罩個資...")
+            mask_result = masker.mask(text)
+
+            pending.append(io_pool.submit(save_output, mask_result.masked, masked_file, "txt"))
+            print_success(f"已遮罩 {mask_result.mask_count} 項敏感資訊")
+            sensitive_items = mask_result.sensitive_items
+            mask_count = mask_result.mask_count
+            masked_text = mask_result.masked
+
+            print_info("步驟 3/4: 結構化提取...")
+            extraction_result = extractor.extract(
+                masked_text,
+                metadata={'filename': args.file},
+                validate=args.validate
+            )
+
+        type_counts = Counter(item['type_name'] for item in sensitive_items)
+
         extracted_file = output_dir / f"{base_name}_extracted.json"
-        save_output(extraction_result, extracted_file, "json")
+        pending.append(io_pool.submit(save_output, extraction_result, extracted_file, "json"))
         
         if extraction_result['success']:
             print_success(f"提取成功 (方法: {extraction_result['method']})")
@@ -346,24 +517,31 @@ def cmd_process(args):
         # 步驟 4: AI 分析（可選）
         if args.ai:
             print_info("步驟 4/4: AI 分析...")
-            provider = AIProvider.OPENAI if args.provider == 'openai' else AIProvider.CLAUDE
-            integrator = AIIntegrator(provider=provider)
-            
+            from utils.ai_integrator import AIIntegrator
+
+            # temperature=0：同 cmd_analyze，快取只對決定性輸出生效
+            integrator = AIIntegrator(provider=_get_provider(args.provider),
+                                      temperature=0)
+
+            if masked_text is None:
+                masked_text = masked_file.read_text(encoding='utf-8')
+
             ai_result = integrator.analyze_document(
-                mask_result.masked,
-                document_type='financial'
+                masked_text,
+                document_type='financial',
+                use_cache=not args.no_cache,
+                semantic_cache=_semantic_cache_or_none(args)
             )
             
             if ai_result.success:
-                ai_file = output_dir / f"{base_name}_ai_analysis.json"
-                try:
-                    parsed = json.loads(ai_result.content)
-                    save_output(parsed, ai_file, "json")
-                    print_success("AI 分析完成")
-                except json.JSONDecodeError:
+                parsed = parse_json_content(ai_result.content)
+                if parsed is not None:
+                    ai_file = output_dir / f"{base_name}_ai_analysis.json"
+                    pending.append(io_pool.submit(save_output, parsed, ai_file, "json"))
+                else:
                     ai_file = output_dir / f"{base_name}_ai_analysis.txt"
-                    save_output(ai_result.content, ai_file, "txt")
-                    print_success("AI 分析完成")
+                    pending.append(io_pool.submit(save_output, ai_result.content, ai_file, "txt"))
+                print_success("AI 分析完成")
             else:
                 print_warning(f"AI 分析失敗: {ai_result.error}")
         
@@ -379,8 +557,8 @@ def cmd_process(args):
                 },
                 'masking': {
                     'status': 'success',
-                    'masked_count': mask_result.mask_count,
-                    'sensitive_types': list(set(item['type_name'] for item in mask_result.sensitive_items))
+                    'masked_count': mask_count,
+                    'sensitive_types': list(type_counts)
                 },
                 'extraction': {
                     'status': 'success' if extraction_result['success'] else 'failed',
@@ -396,8 +574,13 @@ def cmd_process(args):
         }
         
         report_file = output_dir / f"{base_name}_report.json"
-        save_output(report, report_file, "json")
-        
+        pending.append(io_pool.submit(save_output, report, report_file, "json"))
+
+        # 等所有背景寫檔完成再收尾
+        for future in pending:
+            future.result()
+        io_pool.shutdown(wait=True)
+
         print_header("✅ 處理完成")
         print_info(f"所有檔案已儲存至: {output_dir}")
         
@@ -405,7 +588,7 @@ def cmd_process(args):
         
     except PermissionError as e:
         print_error(f"PDF 已加密: {e}")
-        parser = PDFParser()
+        parser = get_thread_parser()
         if parser.default_passwords:
             print_info(f"已嘗試 {len(parser.default_passwords)} 個預設密碼，但都失敗")
             print_warning("請檢查 .env 中的密碼是否正確，或使用 --password 參數手動提供")
@@ -419,12 +602,86 @@ def cmd_process(args):
         return 1
 
 
+def _batch_worker(job):
+    """
+    批次處理單一 PDF（由工作行程執行，需為模組層級函數才能 pickle）
+
+    Args:
+        job: (PDF 路徑, 選項字典) tuple
+
+    Returns:
+        (PDF 路徑, cmd_process 的結束碼)
+    """
+    filepath, options = job
+
+    # 檔案層級已經平行了，行程內改走單行程解析，避免巢狀行程池
+    pdf_parser_module.PDF_WORKERS = 1
+
+    args = argparse.Namespace(
+        file=filepath,
+        password=options['password'],
+        output=str(Path(options['output']) / Path(filepath).stem),
+        ai=options['ai'],
+        provider=options['provider'],
+        validate=options['validate'],
+        no_cache=options['no_cache'],
+        semantic_cache=False,
+        fuse=False,
+        workers=None
+    )
+    exit_code = cmd_process(args)
+    _flush()
+    return filepath, exit_code
+
+
+def cmd_batch(args):
+    """批次處理目錄中的所有 PDF"""
+    print_header(f"📦 批次處理: {args.dir}")
+
+    if not os.path.isdir(args.dir):
+        print_error(f"目錄不存在: {args.dir}")
+        return 1
+
+    pdf_paths = sorted(str(p) for p in Path(args.dir).glob('*.pdf'))
+    if not pdf_paths:
+        print_error(f"目錄中沒有 PDF 檔案: {args.dir}")
+        return 1
+
+    workers = args.workers or max((os.cpu_count() or 2) - 1, 1)
+    print_info(f"共 {len(pdf_paths)} 個檔案，使用 {workers} 個行程")
+
+    options = {
+        'password': args.password,
+        'output': args.output,
+        'ai': args.ai,
+        'provider': args.provider,
+        'validate': args.validate,
+        'no_cache': args.no_cache
+    }
+    jobs = [(path, options) for path in pdf_paths]
+
+    failed = []
+    with multiprocessing.Pool(workers) as pool:
+        for filepath, exit_code in pool.imap_unordered(_batch_worker, jobs):
+            if exit_code != 0:
+                failed.append(filepath)
+
+    print_header("📦 批次處理完成")
+    print_info(f"成功: {len(pdf_paths) - len(failed)} / {len(pdf_paths)}")
+    if failed:
+        print_error("失敗的檔案:")
+        for filepath in failed:
+            _print(f"  - {filepath}")
+        return 1
+
+    return 0
+
+
 def cmd_validate(args):
     """驗證 JSON 資料"""
     print_header(f"✓ 驗證資料: {args.file}")
     
-    if not os.path.exists(args.file):
-        print_error(f"檔案不存在: {args.file}")
+    if _stat_or_error(args.file) is None:
         return 1
     
     try:
@@ -433,6 +690,8 @@ def cmd_validate(args):
             data = json.load(f)
         
         # 驗證
+        from utils.schema_validator import SchemaValidator
+
         validator = SchemaValidator()
         
         if args.schema:
@@ -490,6 +749,7 @@ def main():
     parse_parser.add_argument('file', help='PDF 檔案路徑')
     parse_parser.add_argument('--password', '-p', help='PDF 密碼')
     parse_parser.add_argument('--output', '-o', help='輸出檔案路徑')
+    parse_parser.add_argument('--workers', '-w', type=int, help='平行解析的行程數（預設為 CPU 核心數）')
     
     # mask 指令
     mask_parser = subparsers.add_parser('mask', help='遮罩個資')
@@ -508,6 +768,9 @@ def main():
     analyze_parser.add_argument('--doc-type', default='financial', help='文件類型')
     analyze_parser.add_argument('--instructions', help='額外指示')
     analyze_parser.add_argument('--no-mask', action='store_true', help='不遮罩個資')
+    analyze_parser.add_argument('--no-cache', action='store_true', help='不使用 AI 回應快取')
+    analyze_parser.add_argument('--semantic-cache', action='store_true',
+                                help='啟用語意快取（需安裝 sentence-transformers）')
     analyze_parser.add_argument('--output', '-o', help='輸出檔案路徑')
     
     # process 指令
@@ -518,7 +781,24 @@ def main():
     process_parser.add_argument('--ai', action='store_true', help='啟用 AI 分析')
     process_parser.add_argument('--provider', default='openai', choices=['openai', 'claude'], help='AI 服務提供者')
     process_parser.add_argument('--validate', action='store_true', help='驗證提取結果')
+    process_parser.add_argument('--no-cache', action='store_true', help='不使用 AI 回應快取')
+    process_parser.add_argument('--semantic-cache', action='store_true',
+                                help='啟用語意快取（需安裝 sentence-transformers）')
+    process_parser.add_argument('--fuse', action='store_true',
+                                help='融合遮罩與提取為單次掃描（大型 PDF 省記憶體）')
+    process_parser.add_argument('--workers', '-w', type=int, help='平行解析的行程數（預設為 CPU 核心數）')
     
+    # batch 指令
+    batch_parser = subparsers.add_parser('batch', help='批次處理目錄中的所有 PDF')
+    batch_parser.add_argument('dir', help='PDF 目錄路徑')
+    batch_parser.add_argument('--password', '-p', help='PDF 密碼')
+    batch_parser.add_argument('--output', '-o', default='output', help='輸出目錄')
+    batch_parser.add_argument('--ai', action='store_true', help='啟用 AI 分析')
+    batch_parser.add_argument('--provider', default='openai', choices=['openai', 'claude'], help='AI 服務提供者')
+    batch_parser.add_argument('--validate', action='store_true', help='驗證提取結果')
+    batch_parser.add_argument('--no-cache', action='store_true', help='不使用 AI 回應快取')
+    batch_parser.add_argument('--workers', '-w', type=int, help='平行處理的行程數（預設為 CPU 核心數 - 1）')
+
     # validate 指令
     validate_parser = subparsers.add_parser('validate', help='驗證 JSON 資料')
     validate_parser.add_argument('file', help='JSON 檔案路徑')
@@ -536,10 +816,14 @@ def main():
         'mask': cmd_mask,
         'analyze': cmd_analyze,
         'process': cmd_process,
+        'batch': cmd_batch,
         'validate': cmd_validate
     }
     
-    return commands[args.command](args)
+    try:
+        return commands[args.command](args)
+    finally:
+        _flush()
 
 
 if __name__ == '__main__':
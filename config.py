@@ -2,9 +2,14 @@
 配置檔案
 """
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
-load_dotenv()
+# .env 只需解析一次：multiprocessing 工作行程繼承父行程的環境變數，
+# 看到旗標就跳過重新讀檔
+if not os.getenv('_DOTENV_LOADED'):
+    load_dotenv()
+    os.environ['_DOTENV_LOADED'] = '1'
 
 
 class Config:
@@ -45,8 +50,9 @@ config = {
 }
 
 
+@lru_cache(maxsize=8)
 def get_config(env=None):
-    """取得配置"""
+    """取得配置（同樣的 env 重複呼叫直接回傳快取結果，不再查環境變數）"""
     if env is None:
         env = os.getenv('FLASK_ENV', 'development')
     return config.get(env, config['default'])
@@ -0,0 +1,23 @@
+"""
+Gunicorn 設定
+
+正式環境以 gunicorn 啟動（Werkzeug 開發伺服器單執行緒，
+一個行程同時只能處理一個請求）：
+
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+
+gthread worker 適合這個服務的型態：webhook 上傳與 AI 呼叫
+大多在等 I/O，解析重活已交給行程池/執行緒池。
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+worker_class = 'gthread'
+
+# 大型 PDF 的解析可能超過預設 30 秒
+timeout = 120
+# 比常見 LB 的 idle timeout（60 秒）略長，避免連線被中途切斷
+keepalive = 65
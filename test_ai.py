@@ -3,9 +3,14 @@
 AI 整合測試工具
 
 測試 AI API 整合功能
+
+三個測試各是一次獨立的 AI API 呼叫（數秒），以執行緒池平行執行，
+總時間從三次呼叫的總和降為最慢的一次；每個測試把輸出收集成字串
+回傳，最後依固定順序印出，避免平行執行時輸出交錯。
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from utils.ai_integrator import AIIntegrator, AIProvider, analyze_financial_document
 
@@ -61,11 +66,12 @@ def check_api_keys():
 
 
 def test_basic_analysis():
-    """基本分析測試"""
-    print("=" * 60)
-    print("🧪 基本 AI 分析測試")
-    print("=" * 60)
-    print()
+    """基本分析測試（回傳輸出字串）"""
+    out = []
+    out.append("=" * 60)
+    out.append("🧪 基本 AI 分析測試")
+    out.append("=" * 60)
+    out.append("")
     
     # 測試文字
     test_text = """
@@ -86,49 +92,52 @@ def test_basic_analysis():
     """
     
     provider = AIProvider.OPENAI if os.getenv('OPENAI_API_KEY') else AIProvider.CLAUDE
-    
-    print(f"使用 AI 服務: {provider.value}")
-    print()
-    print("分析文字：")
-    print("-" * 60)
-    print(test_text)
-    print("-" * 60)
-    print()
-    
+
+    out.append(f"使用 AI 服務: {provider.value}")
+    out.append("")
+    out.append("分析文字：")
+    out.append("-" * 60)
+    out.append(test_text)
+    out.append("-" * 60)
+    out.append("")
+
     try:
         integrator = AIIntegrator(provider=provider)
         response = integrator.analyze_document(test_text, document_type="bank_statement")
-        
+
         if response.success:
-            print("✅ 分析成功")
-            print()
-            print("分析結果：")
-            print("-" * 60)
-            print(response.content)
-            print("-" * 60)
-            
+            out.append("✅ 分析成功")
+            out.append("")
+            out.append("分析結果：")
+            out.append("-" * 60)
+            out.append(response.content)
+            out.append("-" * 60)
+
             if response.usage:
-                print()
-                print("使用量：")
-                print(f"  - 輸入 tokens: {response.usage.get('prompt_tokens', 'N/A')}")
-                print(f"  - 輸出 tokens: {response.usage.get('completion_tokens', 'N/A')}")
-                print(f"  - 總計 tokens: {response.usage.get('total_tokens', 'N/A')}")
+                out.append("")
+                out.append("使用量：")
+                out.append(f"  - 輸入 tokens: {response.usage.get('prompt_tokens', 'N/A')}")
+                out.append(f"  - 輸出 tokens: {response.usage.get('completion_tokens', 'N/A')}")
+                out.append(f"  - 總計 tokens: {response.usage.get('total_tokens', 'N/A')}")
         else:
-            print("❌ 分析失敗")
-            print(f"錯誤：{response.error}")
-    
+            out.append("❌ 分析失敗")
+            out.append(f"錯誤：{response.error}")
+
     except ValueError as e:
-        print(f"❌ 設定錯誤: {str(e)}")
+        out.append(f"❌ 設定錯誤: {str(e)}")
     except Exception as e:
-        print(f"❌ 錯誤: {str(e)}")
+        out.append(f"❌ 錯誤: {str(e)}")
+
+    return "\n".join(out)
 
 
 def test_summarize():
-    """摘要測試"""
-    print("\n\n" + "=" * 60)
-    print("📝 文字摘要測試")
-    print("=" * 60)
-    print()
+    """摘要測試（回傳輸出字串）"""
+    out = []
+    out.append("\n\n" + "=" * 60)
+    out.append("📝 文字摘要測試")
+    out.append("=" * 60)
+    out.append("")
     
     long_text = """
     本期信用卡帳單包含多筆消費記錄。主要消費項目包括餐飲、交通、購物等。
@@ -140,38 +149,41 @@ def test_summarize():
     """
     
     provider = AIProvider.OPENAI if os.getenv('OPENAI_API_KEY') else AIProvider.CLAUDE
-    
-    print(f"使用 AI 服務: {provider.value}")
-    print()
-    print("原始文字：")
-    print(long_text)
-    print()
-    
+
+    out.append(f"使用 AI 服務: {provider.value}")
+    out.append("")
+    out.append("原始文字：")
+    out.append(long_text)
+    out.append("")
+
     try:
         integrator = AIIntegrator(provider=provider)
         response = integrator.summarize(long_text, max_length=100)
-        
+
         if response.success:
-            print("✅ 摘要成功")
-            print()
-            print("摘要結果：")
-            print("-" * 60)
-            print(response.content)
-            print("-" * 60)
+            out.append("✅ 摘要成功")
+            out.append("")
+            out.append("摘要結果：")
+            out.append("-" * 60)
+            out.append(response.content)
+            out.append("-" * 60)
         else:
-            print("❌ 摘要失敗")
-            print(f"錯誤：{response.error}")
-    
+            out.append("❌ 摘要失敗")
+            out.append(f"錯誤：{response.error}")
+
     except Exception as e:
-        print(f"❌ 錯誤: {str(e)}")
+        out.append(f"❌ 錯誤: {str(e)}")
+
+    return "\n".join(out)
 
 
 def test_structured_extraction():
-    """結構化資料提取測試"""
-    print("\n\n" + "=" * 60)
-    print("📊 結構化資料提取測試")
-    print("=" * 60)
-    print()
+    """結構化資料提取測試（回傳輸出字串）"""
+    out = []
+    out.append("\n\n" + "=" * 60)
+    out.append("📊 結構化資料提取測試")
+    out.append("=" * 60)
+    out.append("")
     
     text = """
     信用卡帳單
@@ -189,33 +201,35 @@ def test_structured_extraction():
     }
     
     provider = AIProvider.OPENAI if os.getenv('OPENAI_API_KEY') else AIProvider.CLAUDE
-    
-    print(f"使用 AI 服務: {provider.value}")
-    print()
-    print("文字內容：")
-    print(text)
-    print()
-    print("期望結構：")
-    print(schema)
-    print()
-    
+
+    out.append(f"使用 AI 服務: {provider.value}")
+    out.append("")
+    out.append("文字內容：")
+    out.append(text)
+    out.append("")
+    out.append("期望結構：")
+    out.append(str(schema))
+    out.append("")
+
     try:
         integrator = AIIntegrator(provider=provider)
         response = integrator.extract_structured_data(text, schema)
-        
+
         if response.success:
-            print("✅ 提取成功")
-            print()
-            print("提取結果：")
-            print("-" * 60)
-            print(response.content)
-            print("-" * 60)
+            out.append("✅ 提取成功")
+            out.append("")
+            out.append("提取結果：")
+            out.append("-" * 60)
+            out.append(response.content)
+            out.append("-" * 60)
         else:
-            print("❌ 提取失敗")
-            print(f"錯誤：{response.error}")
-    
+            out.append("❌ 提取失敗")
+            out.append(f"錯誤：{response.error}")
+
     except Exception as e:
-        print(f"❌ 錯誤: {str(e)}")
+        out.append(f"❌ 錯誤: {str(e)}")
+
+    return "\n".join(out)
 
 
 if __name__ == '__main__':
@@ -232,11 +246,12 @@ if __name__ == '__main__':
         exit(1)
     
     try:
-        # 執行測試
-        test_basic_analysis()
-        test_summarize()
-        test_structured_extraction()
-        
+        # 三個測試平行執行（各自是獨立的 API 呼叫），依固定順序印出結果
+        tests = [test_basic_analysis, test_summarize, test_structured_extraction]
+        with ThreadPoolExecutor(max_workers=len(tests)) as pool:
+            for output in pool.map(lambda t: t(), tests):
+                print(output)
+
         print("\n\n" + "=" * 60)
         print("✅ 所有測試完成")
         print("=" * 60)
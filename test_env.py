@@ -5,11 +5,10 @@
 """
 
 import os
-from dotenv import load_dotenv
-from utils.pdf_parser import PDFParser
+from utils.env_bootstrap import ensure_env
 
-# 載入環境變數
-load_dotenv()
+# 載入環境變數（同一行程內只解析一次 .env）
+ensure_env()
 
 print("=" * 60)
 print("🔍 環境變數檢查")
@@ -34,17 +33,15 @@ if os.path.exists(env_file):
     else:
         print("PDF_DEFAULT_PASSWORDS: (未設定)")
     
-    # 檢查編號密碼
-    numbered_passwords = []
-    i = 1
-    while True:
-        pwd = os.getenv(f'PDF_PASSWORD_{i}')
-        if not pwd:
-            break
-        numbered_passwords.append(pwd)
+    # 檢查編號密碼（單次掃描 os.environ，不逐一 getenv 試探）
+    numbered_passwords = sorted(
+        (int(key.rsplit('_', 1)[1]), value)
+        for key, value in os.environ.items()
+        if key.startswith('PDF_PASSWORD_') and key.rsplit('_', 1)[1].isdigit()
+    )
+    for i, pwd in numbered_passwords:
         print(f"PDF_PASSWORD_{i}: {pwd}")
-        i += 1
-    
+
     if numbered_passwords:
         print(f"  → 找到 {len(numbered_passwords)} 個編號密碼")
     else:
@@ -57,7 +54,10 @@ else:
 print()
 print("-" * 60)
 
-# 測試 PDFParser
+# 測試 PDFParser（到這裡才 import，.env 檢查不用付
+# PDFParser 模組載入與正則編譯的成本）
+from utils.pdf_parser import PDFParser, mask_password
+
 print(f"\n🔧 PDFParser 狀態:")
 print("-" * 60)
 
@@ -67,12 +67,7 @@ if parser.default_passwords:
     print(f"✅ 已載入 {len(parser.default_passwords)} 個預設密碼")
     print(f"\n密碼列表（遮罩顯示）:")
     for i, pwd in enumerate(parser.default_passwords, 1):
-        # 遮罩顯示
-        if len(pwd) > 2:
-            masked = f"{pwd[0]}{'*' * (len(pwd) - 2)}{pwd[-1]}"
-        else:
-            masked = "***"
-        print(f"  {i}. {masked}")
+        print(f"  {i}. {mask_password(pwd)}")
 else:
     print(f"⚠️  未載入任何預設密碼")
     print(f"\n建議:")
@@ -6,40 +6,45 @@
 """
 
 import sys
-import json
-import argparse
 from pathlib import Path
-from dotenv import load_dotenv
-from utils.pdf_parser import PDFParser
+from utils.env_bootstrap import ensure_env
+from utils.pdf_parser import get_thread_parser
 from utils.extraction_manager import ExtractionManager
-from utils.schema_validator import SchemaValidator
+from utils.json_io import write_json
 
-# 載入環境變數
-load_dotenv()
+# 載入環境變數（同一行程內只解析一次 .env）
+ensure_env()
+
+
+# 分隔線與橫幅在模組載入時組好，print_section 等熱點不再逐次串接
+_SEP70 = "=" * 70
+_BANNER_TOP = "╔" + "═" * 68 + "╗"
+_BANNER_BOT = "╚" + "═" * 68 + "╝"
 
 
 def print_section(title):
     """印出區塊標題"""
-    print("\n" + "=" * 70)
-    print(f"  {title}")
-    print("=" * 70)
+    print(f"\n{_SEP70}\n  {title}\n{_SEP70}")
 
 
-def test_extraction(pdf_path, password=None, enable_ai=False, save_json=False):
+def test_extraction(pdf_path, password=None, enable_ai=False, save_json=False,
+                    parser=None, manager=None):
     """
     測試資訊提取
-    
+
     Args:
         pdf_path: PDF 檔案路徑
         password: PDF 密碼
         enable_ai: 是否啟用 AI fallback
         save_json: 是否儲存 JSON
+        parser: 共用的 PDFParser（批次模式下由 main 建一次傳入）
+        manager: 共用的 ExtractionManager（同上）
     """
     
     # 1. 解析 PDF
     print_section("📄 步驟 1: 解析 PDF")
     
-    parser = PDFParser()
+    parser = parser or get_thread_parser()
     
     try:
         result = parser.extract_text(pdf_path, password)
@@ -60,10 +65,12 @@ def test_extraction(pdf_path, password=None, enable_ai=False, save_json=False):
     # 2. 資訊提取
     print_section("🔍 步驟 2: 結構化資訊提取")
     
-    manager = ExtractionManager(enable_ai_fallback=enable_ai)
+    manager = manager or ExtractionManager(enable_ai_fallback=enable_ai)
+    
+    pdf_file = Path(pdf_path)  # 只解析一次路徑，檔名與輸出檔名共用
     
     metadata = {
-        'filename': Path(pdf_path).name,
+        'filename': pdf_file.name,
         'total_pages': result['total_pages']
     }
     
@@ -118,138 +125,151 @@ def test_extraction(pdf_path, password=None, enable_ai=False, save_json=False):
         print("ℹ️  未進行驗證")
     
     # 5. 儲存 JSON
+    output_dir = Path("output")
     if save_json:
         print_section("💾 步驟 5: 儲存 JSON")
         
-        output_dir = Path("output")
         output_dir.mkdir(exist_ok=True)
         
-        filename = Path(pdf_path).stem
+        filename = pdf_file.stem
         json_file = output_dir / f"{filename}_extracted.json"
         
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_json(json_file, data)
         
         print(f"✅ JSON 已儲存: {json_file}")
         
         # 儲存驗證報告
         if validation:
             report_file = output_dir / f"{filename}_validation.json"
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump(validation, f, ensure_ascii=False, indent=2)
+            write_json(report_file, validation)
             print(f"✅ 驗證報告已儲存: {report_file}")
     
     # 6. 摘要
     print_section("📈 摘要")
     
-    print(f"""
-✨ 提取完成！
+    # 逐行組好再一次寫出，不在單一大 f-string 裡插值十多個值
+    summary_lines = [
+        "",
+        "✨ 提取完成！",
+        "",
+        f"📊 提取方式: {extraction_result['method']}",
+        f"📄 文件類型: {data.get('document_type', '未知')}",
+        f"✅ Schema 驗證: {'通過' if validation and validation['valid'] else '失敗' if validation else '未驗證'}",
+        "",
+        "💡 提示：",
+        f"   - 查看完整 JSON: cat {output_dir / f'{pdf_file.stem}_extracted.json'}",
+        "   - 格式化顯示: cat output/*.json | jq .",
+        f"   - 比較原始與提取: diff <(cat \"{pdf_path}\") <(cat output/*.json)",
+        "",
+    ]
+    sys.stdout.write("\n".join(summary_lines) + "\n")
 
-📊 提取方式: {extraction_result['method']}
-📄 文件類型: {data.get('document_type', '未知')}
-✅ Schema 驗證: {'通過' if validation and validation['valid'] else '失敗' if validation else '未驗證'}
 
-💡 提示：
-   - 查看完整 JSON: cat {output_dir / f"{Path(pdf_path).stem}_extracted.json"}
-   - 格式化顯示: cat output/*.json | jq .
-   - 比較原始與提取: diff <(cat "{pdf_path}") <(cat output/*.json)
-    """)
+# 金額格式共用的預綁定 formatter：格式規格只解析一次，
+# 批次列印大量交易時不重複走 format mini-language
+_NTD = "NT$ {:,.0f}".format
 
 
 def print_credit_card_info(data: dict):
-    """顯示信用卡資訊"""
-    print("\n🏦 銀行名稱:", data.get('bank_name', ''))
+    """顯示信用卡資訊（逐行收集、一次寫出，避免數十次 print 呼叫）"""
+    out = [f"\n🏦 銀行名稱: {data.get('bank_name', '')}"]
     
     # 帳單期間
-    period = data.get('statement_period', {})
+    period = data.get('statement_period')
     if period:
-        print(f"\n📅 帳單期間:")
-        print(f"   - 年月: {period.get('year', '')} 年 {period.get('month', '')} 月")
+        out.append(f"\n📅 帳單期間:")
+        out.append(f"   - 年月: {period.get('year', '')} 年 {period.get('month', '')} 月")
         if period.get('statement_date'):
-            print(f"   - 結帳日: {period['statement_date']}")
+            out.append(f"   - 結帳日: {period['statement_date']}")
     
     # 繳款資訊
-    payment = data.get('payment_info', {})
+    payment = data.get('payment_info')
     if payment:
-        print(f"\n💰 繳款資訊:")
-        print(f"   - 本期應繳: NT$ {payment.get('total_amount_due', 0):,.0f}")
-        print(f"   - 最低應繳: NT$ {payment.get('minimum_payment', 0):,.0f}")
+        out.append(f"\n💰 繳款資訊:")
+        out.append(f"   - 本期應繳: {_NTD(payment.get('total_amount_due', 0))}")
+        out.append(f"   - 最低應繳: {_NTD(payment.get('minimum_payment', 0))}")
         if payment.get('due_date'):
-            print(f"   - 繳款期限: {payment['due_date']}")
+            out.append(f"   - 繳款期限: {payment['due_date']}")
         if payment.get('auto_debit'):
             auto = payment['auto_debit']
-            print(f"   - 自動扣繳: {'已設定' if auto.get('enabled') else '未設定'}")
+            out.append(f"   - 自動扣繳: {'已設定' if auto.get('enabled') else '未設定'}")
             if auto.get('account_number'):
-                print(f"     帳號: {auto['account_number']}")
+                out.append(f"     帳號: {auto['account_number']}")
     
     # 卡片資訊
-    card = data.get('card_info', {})
+    card = data.get('card_info')
     if card:
-        print(f"\n💳 卡片資訊:")
+        out.append(f"\n💳 卡片資訊:")
         if card.get('card_type'):
-            print(f"   - 卡片: {card['card_type']}")
+            out.append(f"   - 卡片: {card['card_type']}")
         if card.get('card_last4'):
-            print(f"   - 末4碼: {card['card_last4']}")
+            out.append(f"   - 末4碼: {card['card_last4']}")
         if card.get('credit_limit'):
-            print(f"   - 信用額度: NT$ {card['credit_limit']:,.0f}")
+            out.append(f"   - 信用額度: {_NTD(card['credit_limit'])}")
     
     # 利率資訊
-    interest = data.get('interest_info', {})
+    interest = data.get('interest_info')
     if interest:
-        print(f"\n📊 利率資訊:")
+        out.append(f"\n📊 利率資訊:")
         if interest.get('revolving_apr'):
-            print(f"   - 循環利率: {interest['revolving_apr']}%")
+            out.append(f"   - 循環利率: {interest['revolving_apr']}%")
         if interest.get('installment_apr'):
-            print(f"   - 分期利率: {interest['installment_apr']}%")
+            out.append(f"   - 分期利率: {interest['installment_apr']}%")
     
     # 交易統計
-    summary = data.get('summary', {})
+    summary = data.get('summary')
     if summary:
-        print(f"\n📈 交易統計:")
-        print(f"   - 交易筆數: {summary.get('total_transactions', 0)}")
+        out.append(f"\n📈 交易統計:")
+        out.append(f"   - 交易筆數: {summary.get('total_transactions', 0)}")
         if summary.get('total_purchases'):
-            print(f"   - 消費總額: NT$ {summary['total_purchases']:,.0f}")
+            out.append(f"   - 消費總額: {_NTD(summary['total_purchases'])}")
         if summary.get('total_payments'):
-            print(f"   - 繳款總額: NT$ {summary['total_payments']:,.0f}")
+            out.append(f"   - 繳款總額: {_NTD(summary['total_payments'])}")
     
     # 顯示前 5 筆交易
-    transactions = data.get('transactions', [])
+    transactions = data.get('transactions')
     if transactions:
-        print(f"\n💸 最近交易 (前 5 筆):")
+        out.append(f"\n💸 最近交易 (前 5 筆):")
         for i, txn in enumerate(transactions[:5], 1):
-            print(f"\n   {i}. {txn.get('description', '')}")
-            print(f"      日期: {txn.get('transaction_date', '')}")
-            print(f"      金額: NT$ {txn.get('amount', 0):,.0f}")
+            out.append(f"\n   {i}. {txn.get('description', '')}")
+            out.append(f"      日期: {txn.get('transaction_date', '')}")
+            out.append(f"      金額: {_NTD(txn.get('amount', 0))}")
             if txn.get('transaction_type'):
-                print(f"      類型: {txn['transaction_type']}")
+                out.append(f"      類型: {txn['transaction_type']}")
         
         if len(transactions) > 5:
-            print(f"\n   ... 還有 {len(transactions) - 5} 筆交易")
+            out.append(f"\n   ... 還有 {len(transactions) - 5} 筆交易")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def print_bank_statement_info(data: dict):
-    """顯示銀行對帳單資訊"""
-    print("\n🏦 銀行名稱:", data.get('bank_name', ''))
+    """顯示銀行對帳單資訊（逐行收集、一次寫出）"""
+    out = [f"\n🏦 銀行名稱: {data.get('bank_name', '')}"]
     
-    account = data.get('account_info', {})
+    account = data.get('account_info')
     if account:
-        print(f"\n💼 帳戶資訊:")
-        print(f"   - 帳號: {account.get('account_number', '')}")
-        print(f"   - 戶名: {account.get('account_name', '')}")
+        out.append(f"\n💼 帳戶資訊:")
+        out.append(f"   - 帳號: {account.get('account_number', '')}")
+        out.append(f"   - 戶名: {account.get('account_name', '')}")
     
-    balance = data.get('balance_info', {})
+    balance = data.get('balance_info')
     if balance:
-        print(f"\n💰 餘額資訊:")
-        print(f"   - 期初餘額: NT$ {balance.get('opening_balance', 0):,.0f}")
-        print(f"   - 期末餘額: NT$ {balance.get('closing_balance', 0):,.0f}")
+        out.append(f"\n💰 餘額資訊:")
+        out.append(f"   - 期初餘額: {_NTD(balance.get('opening_balance', 0))}")
+        out.append(f"   - 期末餘額: {_NTD(balance.get('closing_balance', 0))}")
         if balance.get('total_deposits'):
-            print(f"   - 存款總額: NT$ {balance['total_deposits']:,.0f}")
+            out.append(f"   - 存款總額: {_NTD(balance['total_deposits'])}")
         if balance.get('total_withdrawals'):
-            print(f"   - 提款總額: NT$ {balance['total_withdrawals']:,.0f}")
+            out.append(f"   - 提款總額: {_NTD(balance['total_withdrawals'])}")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def main():
     """主程式"""
+    import argparse  # 只有當成腳本執行才需要，import 階段不付這筆成本
+    
     parser = argparse.ArgumentParser(
         description='測試結構化資訊提取',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -269,33 +289,46 @@ def main():
         """
     )
     
-    parser.add_argument('pdf_file', help='PDF 檔案路徑')
+    parser.add_argument('pdf_files', nargs='+', metavar='pdf_file',
+                       help='PDF 檔案路徑（可一次給多個，同一行程內共用解析器與驗證器）')
     parser.add_argument('--password', '-p', help='PDF 密碼（如果有加密）')
     parser.add_argument('--enable-ai', '-a', action='store_true', 
                        help='啟用 AI fallback（規則失敗時使用）')
     parser.add_argument('--save-json', '-s', action='store_true',
                        help='儲存 JSON 結果到 output/ 目錄')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='失敗時顯示完整 traceback')
     
     args = parser.parse_args()
     
     # 檢查檔案
-    if not Path(args.pdf_file).exists():
-        print(f"❌ 錯誤: 找不到檔案 '{args.pdf_file}'")
+    missing = [p for p in args.pdf_files if not Path(p).exists()]
+    if missing:
+        for p in missing:
+            print(f"❌ 錯誤: 找不到檔案 '{p}'")
         return 1
     
     # 執行測試
     print("\n")
-    print("╔" + "═" * 68 + "╗")
+    print(_BANNER_TOP)
     print("║" + " " * 18 + "結構化資訊提取測試" + " " * 18 + "║")
-    print("╚" + "═" * 68 + "╝")
+    print(_BANNER_BOT)
     
     try:
-        test_extraction(
-            args.pdf_file,
-            password=args.password,
-            enable_ai=args.enable_ai,
-            save_json=args.save_json
-        )
+        # 解析器與提取管理器（含 Schema 驗證器）只建一次，
+        # 多檔批次共用，不必每個檔案重新初始化
+        pdf_parser = get_thread_parser()
+        manager = ExtractionManager(enable_ai_fallback=args.enable_ai)
+
+        for pdf_path in args.pdf_files:
+            test_extraction(
+                pdf_path,
+                password=args.password,
+                enable_ai=args.enable_ai,
+                save_json=args.save_json,
+                parser=pdf_parser,
+                manager=manager
+            )
         return 0
     
     except KeyboardInterrupt:
@@ -303,8 +336,9 @@ def main():
         return 1
     except Exception as e:
         print(f"\n❌ 測試失敗: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        if args.verbose:
+            import traceback
+            traceback.print_exc()
         return 1
 
 
@@ -6,38 +6,54 @@ PDF 遮罩效果測試工具
 """
 
 import sys
-import argparse
+from collections import defaultdict
 from pathlib import Path
-from dotenv import load_dotenv
-from utils.pdf_parser import PDFParser
+from utils.env_bootstrap import ensure_env
+from utils.pdf_parser import get_thread_parser
 from utils.privacy_masker import PrivacyMasker, SmartPrivacyMasker
 
-# 載入環境變數
-load_dotenv()
+# 載入環境變數（同一行程內只解析一次 .env）
+ensure_env()
+
+
+# 分隔線與橫幅在模組載入時組好，print_section 等熱點不再逐次串接
+_SEP70 = "=" * 70
+_BANNER_TOP = "╔" + "═" * 68 + "╗"
+_BANNER_BOT = "╚" + "═" * 68 + "╝"
 
 
 def print_section(title):
     """印出區塊標題"""
-    print("\n" + "=" * 70)
-    print(f"  {title}")
-    print("=" * 70)
+    print(f"\n{_SEP70}\n  {title}\n{_SEP70}")
 
 
-def test_pdf_masking(pdf_path, password=None, aggressive=False, mask_types=None):
+def build_masker(aggressive=False, mask_types=None):
+    """依參數建立遮罩器（批次模式下在 main 建一次共用）"""
+    if aggressive:
+        return SmartPrivacyMasker(aggressive=True)
+    if mask_types:
+        return PrivacyMasker(mask_types=mask_types)
+    return PrivacyMasker()
+
+
+def test_pdf_masking(pdf_path, password=None, aggressive=False, mask_types=None,
+                     parser=None, masker=None):
     """
     測試 PDF 遮罩效果
-    
+
     Args:
         pdf_path: PDF 檔案路徑
         password: PDF 密碼
         aggressive: 是否使用積極模式
         mask_types: 要遮罩的類型列表
+        parser: 共用的 PDFParser（批次模式下由 main 建一次傳入）
+        masker: 共用的遮罩器（同上）
     """
     
     # 1. 解析 PDF
     print_section("📄 步驟 1: 解析 PDF")
     
-    parser = PDFParser()
+    parser = parser or get_thread_parser()
     
     try:
         result = parser.extract_text(pdf_path, password)
@@ -63,29 +79,25 @@ def test_pdf_masking(pdf_path, password=None, aggressive=False, mask_types=None)
     # 2. 偵測敏感資訊
     print_section("🔍 步驟 2: 偵測敏感資訊")
     
+    masker = masker or build_masker(aggressive, mask_types)
     if aggressive:
-        masker = SmartPrivacyMasker(aggressive=True)
         print("使用模式: 智慧積極模式")
     elif mask_types:
-        masker = PrivacyMasker(mask_types=mask_types)
         print(f"使用模式: 選擇性遮罩 ({', '.join(mask_types)})")
     else:
-        masker = PrivacyMasker()
         print("使用模式: 標準模式")
     
     sensitive_items = masker.detect(original_text)
-    
+
+    # 統計各類型（defaultdict 單次探查；同時確保沒偵測到任何
+    # 敏感資料時，後面摘要引用 type_counts 也不會出錯）
+    type_counts = defaultdict(list)
+    for item in sensitive_items:
+        type_counts[item['type_name']].append(item['masked'])
+
     if sensitive_items:
         print(f"\n✅ 偵測到 {len(sensitive_items)} 個敏感資料：")
-        
-        # 統計各類型
-        type_counts = {}
-        for item in sensitive_items:
-            type_name = item['type_name']
-            if type_name not in type_counts:
-                type_counts[type_name] = []
-            type_counts[type_name].append(item['masked'])
-        
+
         for type_name, items in type_counts.items():
             print(f"\n   📌 {type_name} ({len(items)} 個)：")
             for i, masked_value in enumerate(items[:3], 1):  # 只顯示前 3 個
@@ -95,23 +107,41 @@ def test_pdf_masking(pdf_path, password=None, aggressive=False, mask_types=None)
     else:
         print("ℹ️  未偵測到敏感資料")
     
-    # 3. 遮罩處理
+    # 3. 遮罩處理（串流寫出，不在記憶體組第二份全文）
     print_section("🔒 步驟 3: 執行遮罩")
     
-    mask_result = masker.mask(original_text)
-    masked_text = mask_result.masked
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    stem = Path(pdf_path).stem  # 只解析一次路徑，後面三個輸出檔名共用
+    masked_file = output_dir / f"{stem}_masked.txt"
+    
+    preview_length = 1000
+    masked_items = []
+    masked_length = 0
+    preview_parts = []  # 只保留前 1000 字元供對比顯示
+    preview_size = 0
+    
+    # 1 MiB 緩衝：串流遮罩會產生大量小段寫入，
+    # 放大緩衝把 write() 系統呼叫數降到原本的百分之一以下
+    with open(masked_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        for kind, chunk in masker.mask_stream(original_text, masked_items):
+            f.write(chunk)
+            masked_length += len(chunk)
+            if preview_size < preview_length:
+                part = chunk[:preview_length - preview_size]
+                preview_parts.append(part)
+                preview_size += len(part)
+    
+    mask_count = len(masked_items)
     
     print(f"✅ 遮罩完成")
-    print(f"   - 遮罩項目: {mask_result.mask_count} 個")
+    print(f"   - 遮罩項目: {mask_count} 個")
     print(f"   - 原始長度: {len(original_text)} 字元")
-    print(f"   - 遮罩後長度: {len(masked_text)} 字元")
+    print(f"   - 遮罩後長度: {masked_length} 字元")
     
     # 4. 顯示對比
     print_section("📊 步驟 4: 原始 vs 遮罩對比")
     
-    # 取前 1000 字元顯示
-    preview_length = 1000
-    
     print("\n🔓 原始文字（前 1000 字元）：")
     print("-" * 70)
     print(original_text[:preview_length])
@@ -121,43 +151,37 @@ def test_pdf_masking(pdf_path, password=None, aggressive=False, mask_types=None)
     
     print("\n🔒 遮罩後文字（前 1000 字元）：")
     print("-" * 70)
-    print(masked_text[:preview_length])
-    if len(masked_text) > preview_length:
-        print(f"\n... 還有 {len(masked_text) - preview_length} 字元")
+    print("".join(preview_parts))
+    if masked_length > preview_length:
+        print(f"\n... 還有 {masked_length - preview_length} 字元")
     print("-" * 70)
     
     # 5. 儲存結果（選填）
     print_section("💾 步驟 5: 儲存結果")
     
-    output_dir = Path("output")
-    output_dir.mkdir(exist_ok=True)
-    
     # 儲存原始文字
-    original_file = output_dir / f"{Path(pdf_path).stem}_original.txt"
-    with open(original_file, 'w', encoding='utf-8') as f:
+    original_file = output_dir / f"{stem}_original.txt"
+    with open(original_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
         f.write(original_text)
     print(f"✅ 原始文字已儲存: {original_file}")
     
-    # 儲存遮罩文字
-    masked_file = output_dir / f"{Path(pdf_path).stem}_masked.txt"
-    with open(masked_file, 'w', encoding='utf-8') as f:
-        f.write(masked_text)
+    # 遮罩文字已在步驟 3 串流寫出
     print(f"✅ 遮罩文字已儲存: {masked_file}")
     
     # 儲存敏感資料清單
-    report_file = output_dir / f"{Path(pdf_path).stem}_report.txt"
-    with open(report_file, 'w', encoding='utf-8') as f:
+    report_file = output_dir / f"{stem}_report.txt"
+    with open(report_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
         f.write(f"PDF 個資遮罩報告\n")
         f.write(f"=" * 70 + "\n\n")
         f.write(f"檔案: {pdf_path}\n")
         f.write(f"頁數: {result['total_pages']}\n")
         f.write(f"遮罩模式: {'智慧積極模式' if aggressive else '標準模式'}\n")
-        f.write(f"遮罩項目: {mask_result.mask_count} 個\n\n")
+        f.write(f"遮罩項目: {mask_count} 個\n\n")
         
         f.write(f"敏感資料清單：\n")
         f.write(f"-" * 70 + "\n")
         
-        for item in mask_result.sensitive_items:
+        for item in masked_items:
             f.write(f"\n{item['type_name']}:\n")
             f.write(f"  原始: {item['original']}\n")
             f.write(f"  遮罩: {item['masked']}\n")
@@ -167,29 +191,36 @@ def test_pdf_masking(pdf_path, password=None, aggressive=False, mask_types=None)
     # 6. 統計摘要
     print_section("📈 統計摘要")
     
-    print(f"""
-✨ 測試完成！
-
-📊 統計資訊：
-   - PDF 頁數: {result['total_pages']}
-   - 原始文字: {len(original_text):,} 字元
-   - 遮罩項目: {mask_result.mask_count} 個
-   - 遮罩類型: {len(type_counts)} 種
-   
-📁 輸出檔案：
-   - 原始文字: {original_file}
-   - 遮罩文字: {masked_file}
-   - 遮罩報告: {report_file}
-
-💡 提示：
-   - 使用 diff 比較: diff {original_file} {masked_file}
-   - 查看報告: cat {report_file}
-   - 測試 AI 分析: curl -X POST http://localhost:12345/api/ai/mask-and-analyze -F "file=@{pdf_path}"
-    """)
+    # 逐行組好再一次寫出，不在單一大 f-string 裡插值十多個值
+    summary_lines = [
+        "",
+        "✨ 測試完成！",
+        "",
+        "📊 統計資訊：",
+        f"   - PDF 頁數: {result['total_pages']}",
+        f"   - 原始文字: {len(original_text):,} 字元",
+        f"   - 遮罩項目: {mask_count} 個",
+        f"   - 遮罩類型: {len(type_counts)} 種",
+        "",
+        "📁 輸出檔案：",
+        f"   - 原始文字: {original_file}",
+        f"   - 遮罩文字: {masked_file}",
+        f"   - 遮罩報告: {report_file}",
+        "",
+        "💡 提示：",
+        f"   - 使用 diff 比較: diff {original_file} {masked_file}",
+        f"   - 查看報告: cat {report_file}",
+        "   - 測試 AI 分析: curl -X POST http://localhost:12345/api/ai/mask-and-analyze"
+        f" -F \"file=@{pdf_path}\"",
+        "",
+    ]
+    sys.stdout.write("\n".join(summary_lines) + "\n")
 
 
 def main():
     """主程式"""
+    import argparse  # 只有當成腳本執行才需要，import 階段不付這筆成本
+    
     parser = argparse.ArgumentParser(
         description='測試 PDF 個資遮罩效果',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -209,17 +240,22 @@ def main():
         """
     )
     
-    parser.add_argument('pdf_file', help='PDF 檔案路徑')
+    parser.add_argument('pdf_files', nargs='+', metavar='pdf_file',
+                       help='PDF 檔案路徑（可一次給多個，同一行程內共用解析器與遮罩器）')
     parser.add_argument('--password', '-p', help='PDF 密碼（如果有加密）')
     parser.add_argument('--aggressive', '-a', action='store_true', 
                        help='使用積極模式（遮罩更多資訊，包含金額）')
     parser.add_argument('--types', '-t', help='要遮罩的類型（逗號分隔）')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='失敗時顯示完整 traceback')
     
     args = parser.parse_args()
     
     # 檢查檔案
-    if not Path(args.pdf_file).exists():
-        print(f"❌ 錯誤: 找不到檔案 '{args.pdf_file}'")
+    missing = [p for p in args.pdf_files if not Path(p).exists()]
+    if missing:
+        for p in missing:
+            print(f"❌ 錯誤: 找不到檔案 '{p}'")
         return 1
     
     # 解析遮罩類型
@@ -229,17 +265,24 @@ def main():
     
     # 執行測試
     print("\n")
-    print("╔" + "═" * 68 + "╗")
+    print(_BANNER_TOP)
     print("║" + " " * 20 + "PDF 個資遮罩測試工具" + " " * 20 + "║")
-    print("╚" + "═" * 68 + "╝")
+    print(_BANNER_BOT)
     
     try:
-        test_pdf_masking(
-            args.pdf_file,
-            password=args.password,
-            aggressive=args.aggressive,
-            mask_types=mask_types
-        )
+        # 解析器與遮罩器只建一次，多檔批次共用
+        pdf_parser = get_thread_parser()
+        masker = build_masker(args.aggressive, mask_types)
+
+        for pdf_path in args.pdf_files:
+            test_pdf_masking(
+                pdf_path,
+                password=args.password,
+                aggressive=args.aggressive,
+                mask_types=mask_types,
+                parser=pdf_parser,
+                masker=masker
+            )
         return 0
     
     except KeyboardInterrupt:
@@ -247,8 +290,9 @@ def main():
         return 1
     except Exception as e:
         print(f"\n❌ 測試失敗: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        if args.verbose:
+            import traceback
+            traceback.print_exc()
         return 1
 
 
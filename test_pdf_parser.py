@@ -17,15 +17,31 @@ PDF 解析器測試工具
 """
 
 import sys
-import json
-import argparse
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
-from utils.pdf_parser import PDFParser
+from utils.env_bootstrap import ensure_env
+from utils.pdf_parser import get_thread_parser
 from utils.document_processor import DocumentProcessor
+from utils.json_io import write_json
 
-# 載入環境變數
-load_dotenv()
+# 載入環境變數（同一行程內只解析一次 .env）
+ensure_env()
+
+
+@lru_cache(maxsize=8)
+def _extract_cached(pdf_path, password, mtime):
+    return get_thread_parser().extract_text(pdf_path, password)
+
+
+def extract_cached(pdf_path, password=None):
+    """
+    解析 PDF 並快取結果
+
+    --all 流程的四個測試都需要同一份 PDF 的文字；以
+    (路徑, 密碼, mtime) 為 key 快取，整個測試只解析一次，
+    檔案被改動時（mtime 變動）才重新解析。
+    """
+    return _extract_cached(pdf_path, password, Path(pdf_path).stat().st_mtime)
 
 
 def print_separator(char='=', length=60):
@@ -42,6 +58,7 @@ def print_section(title):
 
 def format_json(data, indent=2):
     """格式化 JSON 輸出"""
+    import json
     return json.dumps(data, ensure_ascii=False, indent=indent)
 
 
@@ -56,14 +73,14 @@ def test_pdf_basic(pdf_path, verbose=False, password=None):
     """
     print_section("PDF 基本資訊")
     
-    parser = PDFParser()
+    parser = get_thread_parser()
     
     # 顯示載入的預設密碼數量
     if parser.default_passwords:
         print(f"🔑 已載入 {len(parser.default_passwords)} 個預設密碼")
     
     try:
-        result = parser.extract_text(pdf_path, password)
+        result = extract_cached(pdf_path, password)
         
         print(f"檔案路徑: {pdf_path}")
         print(f"總頁數: {result['total_pages']}")
@@ -121,14 +138,17 @@ def test_pdf_extraction(pdf_path, password=None):
     """
     print_section("資訊提取測試")
     
-    parser = PDFParser()
+    parser = get_thread_parser()
     
     try:
-        result = parser.extract_text(pdf_path, password)
+        result = extract_cached(pdf_path, password)
         text = result['text']
         
+        # 一次掃描同時取得數字、日期與金額
+        extracted = parser.extract_all(text)
+
         # 測試數字提取
-        numbers = parser.extract_numbers(text)
+        numbers = extracted['numbers']
         print(f"\n找到的數字 ({len(numbers)} 個):")
         for i, num in enumerate(numbers[:10], 1):  # 只顯示前 10 個
             print(f"  {i}. {num:,.2f}")
@@ -136,7 +156,7 @@ def test_pdf_extraction(pdf_path, password=None):
             print(f"  ... 還有 {len(numbers) - 10} 個")
         
         # 測試日期提取
-        dates = parser.extract_dates(text)
+        dates = extracted['dates']
         print(f"\n找到的日期 ({len(dates)} 個):")
         for i, date in enumerate(dates[:10], 1):
             print(f"  {i}. {date}")
@@ -144,7 +164,7 @@ def test_pdf_extraction(pdf_path, password=None):
             print(f"  ... 還有 {len(dates) - 10} 個")
         
         # 測試金額提取
-        amounts = parser.extract_amounts(text)
+        amounts = extracted['amounts']
         print(f"\n金額資訊:")
         print(f"  所有金額: {len(amounts['all_amounts'])} 個")
         if amounts['totals']:
@@ -156,7 +176,7 @@ def test_pdf_extraction(pdf_path, password=None):
         print(f"❌ 錯誤: {str(e)}")
 
 
-def test_document_processing(pdf_path, doc_type='unknown', password=None):
+def test_document_processing(pdf_path, doc_type='unknown', password=None, verbose=False):
     """
     測試文件處理功能
     
@@ -164,15 +184,16 @@ def test_document_processing(pdf_path, doc_type='unknown', password=None):
         pdf_path: PDF 檔案路徑
         doc_type: 文件類型
         password: PDF 密碼
+        verbose: 是否顯示完整 traceback
     """
     print_section(f"文件處理測試 (類型: {doc_type})")
     
-    parser = PDFParser()
+    parser = get_thread_parser()
     processor = DocumentProcessor()
     
     try:
         # 解析 PDF
-        pdf_content = parser.extract_text(pdf_path, password)
+        pdf_content = extract_cached(pdf_path, password)
         
         # 處理文件
         result = processor.process_document(
@@ -209,11 +230,30 @@ def test_document_processing(pdf_path, doc_type='unknown', password=None):
         return None
     except Exception as e:
         print(f"❌ 錯誤: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        if verbose:
+            import traceback
+            traceback.print_exc()
         return None
 
 
+def iter_first_lines(text, n):
+    """
+    逐行產出前 n 行
+
+    text.split('\\n') 會為整份文字建立一個行列表，預覽只需要
+    前 n 行；改用 str.find 逐行切片，掃過的字元數與 n 成正比。
+    """
+    start = 0
+    for _ in range(n):
+        nl = text.find('\n', start)
+        if nl == -1:
+            if start < len(text):
+                yield text[start:]
+            return
+        yield text[start:nl]
+        start = nl + 1
+
+
 def show_text_preview(pdf_path, lines=20, password=None):
     """
     顯示 PDF 文字預覽
@@ -225,19 +265,20 @@ def show_text_preview(pdf_path, lines=20, password=None):
     """
     print_section("PDF 文字內容預覽")
     
-    parser = PDFParser()
+    parser = get_thread_parser()
     
     try:
-        result = parser.extract_text(pdf_path, password)
-        text_lines = result['text'].split('\n')
+        result = extract_cached(pdf_path, password)
+        text = result['text']
         
         print(f"\n前 {lines} 行內容:\n")
-        for i, line in enumerate(text_lines[:lines], 1):
+        for i, line in enumerate(iter_first_lines(text, lines), 1):
             if line.strip():
                 print(f"{i:3d} | {line}")
         
-        if len(text_lines) > lines:
-            print(f"\n... 還有 {len(text_lines) - lines} 行")
+        total_lines = text.count('\n') + 1
+        if total_lines > lines:
+            print(f"\n... 還有 {total_lines - lines} 行")
         
     except PermissionError as e:
         print(f"🔒 PDF 加密錯誤: {str(e)}")
@@ -255,8 +296,7 @@ def save_result(result, output_path):
         output_path: 輸出檔案路徑
     """
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        write_json(output_path, result)
         print(f"\n✅ 結果已儲存到: {output_path}")
     except Exception as e:
         print(f"❌ 儲存失敗: {str(e)}")
@@ -264,6 +304,8 @@ def save_result(result, output_path):
 
 def main():
     """主程式"""
+    import argparse  # 只有當成腳本執行才需要，import 階段不付這筆成本
+    
     parser = argparse.ArgumentParser(
         description='PDF 解析器測試工具',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -326,7 +368,8 @@ def main():
             print()
         
         # 文件處理測試
-        doc_result = test_document_processing(args.pdf_file, args.type, args.password)
+        doc_result = test_document_processing(args.pdf_file, args.type, args.password,
+                                              verbose=args.verbose)
         print()
         
         # 儲存結果
@@ -343,8 +386,8 @@ def main():
         sys.exit(0)
     except Exception as e:
         print(f"\n❌ 發生錯誤: {str(e)}")
-        import traceback
         if args.verbose:
+            import traceback
             traceback.print_exc()
         sys.exit(1)
 
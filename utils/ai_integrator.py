@@ -10,10 +10,14 @@ AI 整合模組
 import os
 import json
 import requests
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter, Retry
+from typing import Dict, Iterator, List, Optional, Any
+from dataclasses import dataclass, asdict
 from enum import Enum
 
+from . import llm_cache
+
 
 class AIProvider(Enum):
     """AI 服務提供者"""
@@ -32,6 +36,9 @@ class AIResponse:
     usage: Optional[Dict] = None
     raw_response: Optional[Dict] = None
     error: Optional[str] = None
+    # 串流模式下逐段產出的內容；content 此時為空字串，
+    # 由呼叫端邊收邊處理（非串流回應此欄位為 None）
+    content_stream: Optional[Iterator[str]] = None
 
 
 class AIIntegrator:
@@ -48,13 +55,58 @@ class AIIntegrator:
         AIProvider.OPENAI: "gpt-4-turbo-preview",
         AIProvider.CLAUDE: "claude-3-sonnet-20240229"
     }
-    
+
+    # 各文件類型的靜態提示詞（預先建好，呼叫時不重組）
+    BASE_PROMPTS = {
+        "financial": """
+你是一個專業的金融文件分析助手。請分析以下文件並提取關鍵資訊。
+
+請以 JSON 格式返回以下資訊：
+{
+    "document_type": "文件類型",
+    "summary": "文件摘要",
+    "key_information": {
+        "金額": "總金額",
+        "日期": "相關日期",
+        "機構": "金融機構名稱"
+    },
+    "transactions": [
+        {
+            "date": "交易日期",
+            "description": "交易描述",
+            "amount": "金額"
+        }
+    ],
+    "recommendations": ["建議事項"]
+}
+""",
+        "bank_statement": """
+你是銀行對帳單分析專家。請分析以下對帳單並提取：
+1. 帳戶資訊
+2. 期初/期末餘額
+3. 所有交易記錄
+4. 統計資訊（收入、支出、結餘）
+
+請以結構化的 JSON 格式返回。
+""",
+        "credit_card": """
+你是信用卡帳單分析專家。請分析以下帳單並提取：
+1. 帳單週期
+2. 應繳金額與到期日
+3. 消費明細
+4. 重要提醒事項
+
+請以結構化的 JSON 格式返回。
+"""
+    }
+
     def __init__(
         self,
         provider: AIProvider = AIProvider.OPENAI,
         api_key: Optional[str] = None,
         model: Optional[str] = None,
-        custom_endpoint: Optional[str] = None
+        custom_endpoint: Optional[str] = None,
+        temperature: float = 0.3
     ):
         """
         初始化 AI 整合器
@@ -64,14 +116,50 @@ class AIIntegrator:
             api_key: API 金鑰（從環境變數讀取）
             model: 使用的模型
             custom_endpoint: 自訂 API 端點
+            temperature: 取樣溫度；只有 0（決定性輸出）的回應
+                才允許寫入/讀取快取
         """
         self.provider = provider
         self.api_key = api_key or self._get_api_key()
         self.model = model or self._get_default_model()
         self.endpoint = custom_endpoint or self.ENDPOINTS.get(provider)
+        self.temperature = temperature
         
         if not self.api_key:
             raise ValueError(f"未設定 API 金鑰（{provider.value}）")
+
+        # 共用連線池：同一個 Session 重複使用 TLS 連線，多文件工作
+        # 不必逐次重付 DNS 解析與 TLS 交握；固定不變的認證標頭掛在
+        # Session 上，不在每次呼叫重建。Retry 對限流/暫時性錯誤自動
+        # 退避重試（429 會遵循 Retry-After）
+        self._session = requests.Session()
+        self._session.headers.update(self._static_headers())
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset(['GET', 'POST']),
+                respect_retry_after_header=True
+            )
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def _static_headers(self) -> Dict[str, str]:
+        """各提供者固定不變的請求標頭"""
+        if self.provider == AIProvider.CLAUDE:
+            return {
+                "x-api-key": self.api_key,
+                "anthropic-version": "2023-06-01",
+                "content-type": "application/json"
+            }
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
     
     def _get_api_key(self) -> Optional[str]:
         """從環境變數取得 API 金鑰"""
@@ -89,95 +177,139 @@ class AIIntegrator:
         self,
         text: str,
         document_type: str = "financial",
-        instructions: Optional[str] = None
+        instructions: Optional[str] = None,
+        use_cache: bool = True,
+        semantic_cache: Optional['llm_cache.SemanticCache'] = None,
+        stream: bool = False
     ) -> AIResponse:
         """
         分析文件內容
-        
+
         Args:
             text: 文件文字內容
             document_type: 文件類型（financial/bank_statement/credit_card 等）
             instructions: 額外指示
-            
+            use_cache: 是否使用磁碟快取（同樣的輸入直接回傳上次的結果）。
+                只在 temperature=0 時生效；取樣輸出不做快取
+            semantic_cache: 選用的語意快取；精確快取未命中時，
+                文字夠相似（例如只差幾列交易的對帳單）也直接回傳快取結果
+            stream: 是否以串流方式回傳；為 True 時 content_stream
+                逐段產出內容、content 為空字串，且回應不寫入快取
+                （完整內容只存在於呼叫端的消費過程中）
+
         Returns:
             AIResponse: AI 分析結果
         """
-        # 建立提示詞
-        prompt = self._build_prompt(text, document_type, instructions)
-        
+        # 快取只對決定性輸出（temperature=0）有意義：取樣出來的
+        # 回應不該被存起來重播，讀取舊快取同理
+        use_cache = use_cache and self.temperature == 0
+
+        # 完全相同的輸入直接取用快取的回應，不重複呼叫 API
+        cache_key = llm_cache.make_key(
+            self.provider.value, self.model, document_type, instructions, text
+        )
+        params_key = llm_cache.make_params_key(
+            self.provider.value, self.model, document_type, instructions
+        )
+        if use_cache:
+            cached = llm_cache.get(cache_key)
+            if cached is None and semantic_cache is not None:
+                # 精確未命中時嘗試語意快取（近似比對）
+                cached = semantic_cache.get(params_key, text)
+            if cached is not None:
+                response = AIResponse(**cached)
+                if stream:
+                    # 快取命中也給出串流介面，呼叫端不必分兩種寫法
+                    response.content_stream = iter([response.content])
+                return response
+
+        # 靜態指示放在 system、動態的文件文字放在最後的 user 訊息，
+        # 讓供應商端的 prompt caching 能命中靜態前綴
+        system_prompt = self._build_system_prompt(document_type, instructions)
+
         # 呼叫 AI API
-        return self._call_api(prompt)
+        response = self._call_api(f"文件內容：\n{text}", system=system_prompt,
+                                  stream=stream)
+
+        # 只快取成功的非串流回應（串流回應沒有完整 content 可存）
+        if use_cache and response.success and not stream:
+            llm_cache.put(cache_key, asdict(response))
+            if semantic_cache is not None:
+                semantic_cache.add(params_key, text, cache_key)
+
+        return response
     
-    def _build_prompt(
+    def analyze_many(
+        self,
+        texts: List[str],
+        document_type: str = "financial",
+        instructions: Optional[str] = None,
+        use_cache: bool = True,
+        semantic_cache: Optional['llm_cache.SemanticCache'] = None,
+        max_concurrent: int = 4
+    ) -> List[AIResponse]:
+        """
+        並行分析多份文件
+
+        requests 等待回應時會釋放 GIL，用執行緒池把 K 份文件的
+        牆鐘時間從各次延遲的總和壓到約略單次延遲；max_concurrent
+        限制同時在途的請求數，避免觸發供應商限流。
+
+        Args:
+            texts: 文件文字列表
+            document_type: 文件類型（同 analyze_document）
+            instructions: 額外指示
+            use_cache: 是否使用磁碟快取
+            semantic_cache: 選用的語意快取
+            max_concurrent: 同時在途的請求數上限
+
+        Returns:
+            與輸入順序一致的 AIResponse 列表
+        """
+        if not texts:
+            return []
+
+        workers = min(max_concurrent, len(texts))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(
+                lambda text: self.analyze_document(
+                    text,
+                    document_type=document_type,
+                    instructions=instructions,
+                    use_cache=use_cache,
+                    semantic_cache=semantic_cache,
+                ),
+                texts
+            ))
+
+    def _build_system_prompt(
         self,
-        text: str,
         document_type: str,
         instructions: Optional[str] = None
     ) -> str:
-        """建立提示詞"""
-        
-        # 基礎提示
-        base_prompts = {
-            "financial": """
-你是一個專業的金融文件分析助手。請分析以下文件並提取關鍵資訊。
-
-請以 JSON 格式返回以下資訊：
-{
-    "document_type": "文件類型",
-    "summary": "文件摘要",
-    "key_information": {
-        "金額": "總金額",
-        "日期": "相關日期",
-        "機構": "金融機構名稱"
-    },
-    "transactions": [
-        {
-            "date": "交易日期",
-            "description": "交易描述",
-            "amount": "金額"
-        }
-    ],
-    "recommendations": ["建議事項"]
-}
-""",
-            "bank_statement": """
-你是銀行對帳單分析專家。請分析以下對帳單並提取：
-1. 帳戶資訊
-2. 期初/期末餘額
-3. 所有交易記錄
-4. 統計資訊（收入、支出、結餘）
+        """
+        建立靜態 system 提示詞（不含文件文字）
 
-請以結構化的 JSON 格式返回。
-""",
-            "credit_card": """
-你是信用卡帳單分析專家。請分析以下帳單並提取：
-1. 帳單週期
-2. 應繳金額與到期日
-3. 消費明細
-4. 重要提醒事項
+        文件文字另外放在 user 訊息；這段靜態前綴在重複分析
+        同類型文件時完全相同，供應商端的 prompt caching 才能命中。
+        """
+        prompt = self.BASE_PROMPTS.get(document_type, self.BASE_PROMPTS["financial"])
 
-請以結構化的 JSON 格式返回。
-"""
-        }
-        
-        prompt = base_prompts.get(document_type, base_prompts["financial"])
-        
         if instructions:
             prompt += f"\n\n額外指示：{instructions}"
-        
-        prompt += f"\n\n文件內容：\n{text}"
-        
+
         return prompt
-    
-    def _call_api(self, prompt: str) -> AIResponse:
+
+    def _call_api(self, prompt: str, system: Optional[str] = None,
+                  stream: bool = False) -> AIResponse:
         """呼叫 AI API"""
         try:
             if self.provider == AIProvider.OPENAI:
-                return self._call_openai(prompt)
+                return self._call_openai(prompt, system, stream)
             elif self.provider == AIProvider.CLAUDE:
-                return self._call_claude(prompt)
+                return self._call_claude(prompt, system, stream)
             else:
-                return self._call_custom(prompt)
+                return self._call_custom(prompt, system, stream)
         except Exception as e:
             return AIResponse(
                 success=False,
@@ -187,32 +319,76 @@ class AIIntegrator:
                 error=str(e)
             )
     
-    def _call_openai(self, prompt: str) -> AIResponse:
+    def _iter_openai_stream(self, response) -> Iterator[str]:
+        """逐段產出 OpenAI SSE 回應的內容片段"""
+        try:
+            for raw in response.iter_lines(decode_unicode=True):
+                if not raw or not raw.startswith('data: '):
+                    continue
+                payload = raw[6:]
+                if payload == '[DONE]':
+                    break
+                choices = json.loads(payload).get('choices')
+                if not choices:
+                    continue
+                piece = choices[0].get('delta', {}).get('content')
+                if piece:
+                    yield piece
+        finally:
+            response.close()
+
+    def _iter_claude_stream(self, response) -> Iterator[str]:
+        """逐段產出 Claude SSE 回應的內容片段"""
+        try:
+            for raw in response.iter_lines(decode_unicode=True):
+                if not raw or not raw.startswith('data: '):
+                    continue
+                event = json.loads(raw[6:])
+                if event.get('type') == 'content_block_delta':
+                    piece = event.get('delta', {}).get('text')
+                    if piece:
+                        yield piece
+        finally:
+            response.close()
+
+    def _call_openai(self, prompt: str, system: Optional[str] = None,
+                     stream: bool = False) -> AIResponse:
         """呼叫 OpenAI API"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
+        # 靜態 system 在前、動態 user 在後（OpenAI 以前綴比對快取）
         data = {
             "model": self.model,
             "messages": [
                 {
                     "role": "system",
-                    "content": "你是一個專業的金融文件分析助手，擅長從文件中提取關鍵資訊。"
+                    "content": system or "你是一個專業的金融文件分析助手，擅長從文件中提取關鍵資訊。"
                 },
                 {
                     "role": "user",
                     "content": prompt
                 }
             ],
-            "temperature": 0.3,
+            "temperature": self.temperature,
             "max_tokens": 2000
         }
-        
-        response = requests.post(self.endpoint, headers=headers, json=data, timeout=60)
+
+        if stream:
+            # 串流模式：token 一到就能往下游送，不等整包回應收完；
+            # 長回應時峰值記憶體只剩單一 SSE 事件的大小
+            data["stream"] = True
+            response = self._session.post(self.endpoint, json=data,
+                                          timeout=60, stream=True)
+            response.raise_for_status()
+            return AIResponse(
+                success=True,
+                content="",
+                provider=self.provider.value,
+                model=self.model,
+                content_stream=self._iter_openai_stream(response)
+            )
+
+        response = self._session.post(self.endpoint, json=data, timeout=60)
         response.raise_for_status()
-        
+
         result = response.json()
         
         return AIResponse(
@@ -224,17 +400,13 @@ class AIIntegrator:
             raw_response=result
         )
     
-    def _call_claude(self, prompt: str) -> AIResponse:
+    def _call_claude(self, prompt: str, system: Optional[str] = None,
+                     stream: bool = False) -> AIResponse:
         """呼叫 Claude API"""
-        headers = {
-            "x-api-key": self.api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json"
-        }
-        
         data = {
             "model": self.model,
             "max_tokens": 2000,
+            "temperature": self.temperature,
             "messages": [
                 {
                     "role": "user",
@@ -242,10 +414,33 @@ class AIIntegrator:
                 }
             ]
         }
-        
-        response = requests.post(self.endpoint, headers=headers, json=data, timeout=60)
+
+        # 靜態 system 區塊標記 cache_control，讓 Anthropic 端快取前綴
+        if system:
+            data["system"] = [
+                {
+                    "type": "text",
+                    "text": system,
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ]
+
+        if stream:
+            data["stream"] = True
+            response = self._session.post(self.endpoint, json=data,
+                                          timeout=60, stream=True)
+            response.raise_for_status()
+            return AIResponse(
+                success=True,
+                content="",
+                provider=self.provider.value,
+                model=self.model,
+                content_stream=self._iter_claude_stream(response)
+            )
+
+        response = self._session.post(self.endpoint, json=data, timeout=60)
         response.raise_for_status()
-        
+
         result = response.json()
         
         return AIResponse(
@@ -257,30 +452,32 @@ class AIIntegrator:
             raw_response=result
         )
     
-    def _call_custom(self, prompt: str) -> AIResponse:
-        """呼叫自訂 API"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
+    def _call_custom(self, prompt: str, system: Optional[str] = None,
+                     stream: bool = False) -> AIResponse:
+        """呼叫自訂 API（單一 prompt 欄位，靜態指示接在最前面）"""
         data = {
-            "prompt": prompt,
-            "model": self.model
+            "prompt": f"{system}\n\n{prompt}" if system else prompt,
+            "model": self.model,
+            "temperature": self.temperature
         }
-        
-        response = requests.post(self.endpoint, headers=headers, json=data, timeout=60)
+
+        response = self._session.post(self.endpoint, json=data, timeout=60)
         response.raise_for_status()
-        
+
         result = response.json()
-        
-        return AIResponse(
+
+        api_response = AIResponse(
             success=True,
             content=result.get('content', result.get('response', '')),
             provider=self.provider.value,
             model=self.model,
             raw_response=result
         )
+        if stream:
+            # 自訂端點的回應格式未知，不假設支援 SSE；
+            # 以一次到位的內容包成串流，介面對呼叫端保持一致
+            api_response.content_stream = iter([api_response.content])
+        return api_response
     
     def extract_structured_data(
         self,
@@ -335,6 +532,222 @@ class AIIntegrator:
         
         return self._call_api(prompt)
 
+    # ===== 批次 API（離線批次分析） =====
+
+    def _api_base(self) -> str:
+        """從即時端點推導 API base（含 /v1）"""
+        return self.endpoint.split('/v1/')[0] + '/v1'
+
+    def submit_batch(
+        self,
+        texts: List[str],
+        document_type: str = "financial",
+        instructions: Optional[str] = None
+    ) -> str:
+        """
+        送出批次分析（Batches API）
+
+        信箱來的 PDF 是離線工作，不需要即時端點的低延遲；批次端點
+        價格約為即時的一半，也不佔即時請求的限流額度。回傳 batch id，
+        結果之後用 fetch_batch_results 取回。
+
+        Args:
+            texts: 文件文字列表
+            document_type: 文件類型（同 analyze_document）
+            instructions: 額外指示
+
+        Returns:
+            批次 ID
+
+        Raises:
+            ValueError: 提供者不支援批次 API
+        """
+        system_prompt = self._build_system_prompt(document_type, instructions)
+
+        if self.provider == AIProvider.CLAUDE:
+            return self._submit_claude_batch(texts, system_prompt)
+        if self.provider == AIProvider.OPENAI:
+            return self._submit_openai_batch(texts, system_prompt)
+        raise ValueError(f"提供者 {self.provider.value} 不支援批次 API")
+
+    def fetch_batch_results(self, batch_id: str) -> Optional[Dict[str, AIResponse]]:
+        """
+        取回批次結果
+
+        Args:
+            batch_id: submit_batch 回傳的批次 ID
+
+        Returns:
+            {custom_id: AIResponse}；批次還在處理中時回傳 None
+
+        Raises:
+            ValueError: 提供者不支援批次 API
+        """
+        if self.provider == AIProvider.CLAUDE:
+            return self._fetch_claude_batch(batch_id)
+        if self.provider == AIProvider.OPENAI:
+            return self._fetch_openai_batch(batch_id)
+        raise ValueError(f"提供者 {self.provider.value} 不支援批次 API")
+
+    def _submit_claude_batch(self, texts: List[str], system_prompt: str) -> str:
+        """送出 Anthropic Message Batches 批次"""
+        batch_requests = []
+        for i, text in enumerate(texts):
+            batch_requests.append({
+                "custom_id": f"doc-{i}",
+                "params": {
+                    "model": self.model,
+                    "max_tokens": 2000,
+                    "temperature": self.temperature,
+                    "system": [
+                        {
+                            "type": "text",
+                            "text": system_prompt,
+                            "cache_control": {"type": "ephemeral"}
+                        }
+                    ],
+                    "messages": [
+                        {"role": "user", "content": f"文件內容：\n{text}"}
+                    ]
+                }
+            })
+
+        response = self._session.post(
+            f"{self._api_base()}/messages/batches",
+            json={"requests": batch_requests},
+            timeout=60
+        )
+        response.raise_for_status()
+        return response.json()['id']
+
+    def _fetch_claude_batch(self, batch_id: str) -> Optional[Dict[str, AIResponse]]:
+        """取回 Anthropic 批次結果（JSONL，每行一份文件）"""
+        status = self._session.get(
+            f"{self._api_base()}/messages/batches/{batch_id}",
+            timeout=60
+        )
+        status.raise_for_status()
+        info = status.json()
+
+        if info.get('processing_status') != 'ended':
+            return None
+
+        results = self._session.get(info['results_url'], timeout=60)
+        results.raise_for_status()
+
+        responses = {}
+        for line in results.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            result = entry.get('result', {})
+
+            if result.get('type') == 'succeeded':
+                message = result['message']
+                responses[entry['custom_id']] = AIResponse(
+                    success=True,
+                    content=message['content'][0]['text'],
+                    provider=self.provider.value,
+                    model=self.model,
+                    usage=message.get('usage'),
+                    raw_response=message
+                )
+            else:
+                responses[entry['custom_id']] = AIResponse(
+                    success=False,
+                    content="",
+                    provider=self.provider.value,
+                    model=self.model,
+                    error=json.dumps(result.get('error', result), ensure_ascii=False)
+                )
+        return responses
+
+    def _submit_openai_batch(self, texts: List[str], system_prompt: str) -> str:
+        """送出 OpenAI 批次（先上傳 JSONL 檔，再建立批次）"""
+        lines = []
+        for i, text in enumerate(texts):
+            lines.append(json.dumps({
+                "custom_id": f"doc-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"文件內容：\n{text}"}
+                    ],
+                    "temperature": self.temperature,
+                    "max_tokens": 2000
+                }
+            }, ensure_ascii=False))
+
+        # multipart 上傳：蓋掉 Session 的 JSON Content-Type，
+        # 讓 requests 自行產生 multipart boundary
+        upload = self._session.post(
+            f"{self._api_base()}/files",
+            headers={'Content-Type': None},
+            files={'file': ('batch.jsonl', '\n'.join(lines).encode('utf-8'))},
+            data={'purpose': 'batch'},
+            timeout=60
+        )
+        upload.raise_for_status()
+
+        create = self._session.post(
+            f"{self._api_base()}/batches",
+            json={
+                "input_file_id": upload.json()['id'],
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h"
+            },
+            timeout=60
+        )
+        create.raise_for_status()
+        return create.json()['id']
+
+    def _fetch_openai_batch(self, batch_id: str) -> Optional[Dict[str, AIResponse]]:
+        """取回 OpenAI 批次結果（下載 output 檔案並逐行解析）"""
+        status = self._session.get(
+            f"{self._api_base()}/batches/{batch_id}",
+            timeout=60
+        )
+        status.raise_for_status()
+        info = status.json()
+
+        if info.get('status') != 'completed':
+            return None
+
+        results = self._session.get(
+            f"{self._api_base()}/files/{info['output_file_id']}/content",
+            timeout=60
+        )
+        results.raise_for_status()
+
+        responses = {}
+        for line in results.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            body = (entry.get('response') or {}).get('body') or {}
+
+            if entry.get('error') is None and body.get('choices'):
+                responses[entry['custom_id']] = AIResponse(
+                    success=True,
+                    content=body['choices'][0]['message']['content'],
+                    provider=self.provider.value,
+                    model=self.model,
+                    usage=body.get('usage'),
+                    raw_response=body
+                )
+            else:
+                responses[entry['custom_id']] = AIResponse(
+                    success=False,
+                    content="",
+                    provider=self.provider.value,
+                    model=self.model,
+                    error=json.dumps(entry.get('error') or body, ensure_ascii=False)
+                )
+        return responses
+
 
 def analyze_financial_document(
     text: str,
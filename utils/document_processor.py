@@ -2,11 +2,170 @@
 文件處理器
 根據文件類型（對帳單、信用卡帳單、消費通知）進行不同處理
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import re
 from datetime import datetime
+from functools import lru_cache
 from .pdf_parser import PDFParser
 
+# 標籤欄位的提取規格：每個欄位列出數個變體，值的擷取群組一律寫成
+# (?P<V>...)。_build_field_scanner 會把所有變體併成一個具名群組
+# alternation，全文只用一次 finditer 掃描、依命中的群組把值分流到
+# 對應欄位，取代逐欄位逐 pattern 的多次全文 re.search
+_FIELD_PATTERNS = {
+    'account_number': (
+        r'(?:帳號|戶號)[:：\s]*(?P<V>\d{10,})',
+        r'Account(?:\s+Number)?[:：\s]*(?P<V>\d{10,})',
+    ),
+    'card_number': (
+        r'(?:卡號|Card(?:\s+Number)?)[:：\s]*(?P<V>[\d*-]+)',
+        r'(?P<V>\d{4}[-\s*]+\d{4}[-\s*]+\d{4}[-\s*]+\d{4})',
+    ),
+    'opening_balance': (
+        r'(?:期初餘額|Opening Balance)[:：\s]*[\$]?(?P<V>[\d,]+\.?\d*)',
+    ),
+    'closing_balance': (
+        r'(?:期末餘額|Closing Balance|結餘)[:：\s]*[\$]?(?P<V>[\d,]+\.?\d*)',
+    ),
+    'minimum_payment': (
+        r'(?:最低應繳金額|Minimum Payment)[:：\s]*[\$]?(?P<V>[\d,]+\.?\d*)',
+    ),
+    'total_amount_due': (
+        r'(?:本期應繳總額|Total Amount Due|應繳金額)[:：\s]*[\$]?(?P<V>[\d,]+\.?\d*)',
+    ),
+    'new_charges': (
+        r'(?:本期新增消費|New Charges)[:：\s]*[\$]?(?P<V>[\d,]+\.?\d*)',
+    ),
+    'due_date': (
+        r'(?:繳款截止日|到期日)[:：\s]*(?P<V>\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)',
+        r'Due\s+Date[:：\s]*(?P<V>\d{4}[-/]\d{1,2}[-/]\d{1,2})',
+    ),
+    'merchant': (
+        r'(?:商家|Merchant|消費地點)[:：\s]*(?P<V>[^\n]+)',
+    ),
+}
+
+
+def _build_field_scanner():
+    """把 _FIELD_PATTERNS 併成單一 alternation 正則與群組對應表"""
+    parts = []
+    field_by_group = {}
+    for field, variants in _FIELD_PATTERNS.items():
+        for i, variant in enumerate(variants):
+            name = f'{field}_{i}'
+            parts.append(variant.replace('(?P<V>', f'(?P<{name}>'))
+            field_by_group[name] = field
+    return re.compile('|'.join(parts), re.IGNORECASE), field_by_group
+
+
+_FIELD_SCAN_RE, _FIELD_BY_GROUP = _build_field_scanner()
+
+# 交易類型關鍵字：鍵的順序即優先序（前面的類別優先）。
+# 所有關鍵字併成一個不分大小寫的 alternation，全文掃一次、
+# 依群組對應回類別，取代逐關鍵字的 `in` 子字串搜尋與 text.lower() 複本
+_TRANSACTION_TYPES = {
+    '消費': ('消費', 'Purchase', 'Debit'),
+    '退款': ('退款', 'Refund', 'Credit'),
+    '轉帳': ('轉帳', 'Transfer'),
+    '提款': ('提款', 'Withdrawal', 'ATM'),
+}
+
+
+def _build_type_scanner():
+    """把 _TRANSACTION_TYPES 併成單一 alternation 正則與群組對應表"""
+    parts = []
+    type_by_group = {}
+    for i, (trans_type, keywords) in enumerate(_TRANSACTION_TYPES.items()):
+        name = f'type{i}'
+        parts.append(
+            f'(?P<{name}>' + '|'.join(re.escape(k) for k in keywords) + ')'
+        )
+        type_by_group[name] = trans_type
+    return re.compile('|'.join(parts), re.IGNORECASE), type_by_group
+
+
+_TYPE_SCAN_RE, _TYPE_BY_GROUP = _build_type_scanner()
+
+# 交易候選行：一行內含日期（任一常見格式）者。re.M 對全文做一次
+# finditer 就能挑出所有候選行，不必 split 後逐行跑正則
+_TXN_LINE_RE = re.compile(
+    r'^(?P<line>[^\n]*?(?P<date>'
+    r'\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?'
+    r'|\d{1,2}[-/]\d{1,2}[-/]\d{4}'
+    r'|\d{4}\.\d{1,2}\.\d{1,2}'
+    r')[^\n]*)$',
+    re.M
+)
+
+# 候選行上的金額候選（與 pdf_parser 的數字樣式一致）。交易只取行上
+# 第一個可解析的數字，用 finditer 邊掃邊試、成功即停，不像
+# extract_numbers 先 findall 收整行的數字再全部轉 float
+_LINE_NUM_RE = re.compile(r'[\$]?[\d,]+\.?\d*')
+
+
+def _first_number(line: str) -> Optional[float]:
+    """取行上第一個可解析的數字，沒有則回傳 None"""
+    for match in _LINE_NUM_RE.finditer(line):
+        amount = _parse_amount(match.group())
+        if amount is not None:
+            return amount
+    return None
+
+
+# 帳單週期不在 _FIELD_PATTERNS（需要兩個擷取群組），單獨預編譯
+_BILLING_PERIOD_RE = re.compile(
+    r'帳單週期[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)'
+    r'\s*[至~-]\s*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)'
+)
+
+
+# 數字字串清理：translate 是 C 實作的單趟刪除，不像連鎖 replace
+# 每步各配置一個中間字串；清完先用 fullmatch 驗證再轉 float，
+# 熱迴圈裡不設 try/except
+_STRIP_CURRENCY = str.maketrans('', '', '$,')
+_NUMERIC_RE = re.compile(r'\d+(?:\.\d*)?')
+
+
+def _parse_amount(value: Optional[str]) -> Optional[float]:
+    """標籤欄位的金額字串轉 float，無值或無法轉換時回傳 None"""
+    if not value:
+        return None
+    cleaned = value.translate(_STRIP_CURRENCY)
+    if _NUMERIC_RE.fullmatch(cleaned):
+        return float(cleaned)
+    return None
+
+
+# 欄位掃描與交易類型判斷都是輸入文字的純函式，同一份文件在
+# 管線內（處理器、摘要、個別 _extract_* 包裝）常被重複詢問；
+# 以文字本身為 key 記憶化，重複呼叫只付一次字典查找。
+# maxsize 壓在 8：key 是整份文件文字，快取會持有其參照，
+# 與 test_pdf_parser 的解析快取同一量級
+@lru_cache(maxsize=8)
+def _scan_fields_cached(text: str) -> Dict[str, str]:
+    fields = {}
+    for match in _FIELD_SCAN_RE.finditer(text):
+        field = _FIELD_BY_GROUP[match.lastgroup]
+        if field not in fields:
+            fields[field] = match.group(match.lastgroup)
+            if len(fields) == len(_FIELD_PATTERNS):
+                break
+    return fields
+
+
+@lru_cache(maxsize=8)
+def _transaction_type_cached(text: str) -> str:
+    found = set()
+    for match in _TYPE_SCAN_RE.finditer(text):
+        found.add(_TYPE_BY_GROUP[match.lastgroup])
+        if len(found) == len(_TRANSACTION_TYPES):
+            break
+
+    for trans_type in _TRANSACTION_TYPES:
+        if trans_type in found:
+            return trans_type
+    return '其他'
+
 
 class DocumentProcessor:
     """文件處理器"""
@@ -52,14 +211,13 @@ class DocumentProcessor:
         # 提取日期資訊
         dates = PDFParser.extract_dates(text)
         
-        # 提取帳號資訊
-        account_number = self._extract_account_number(text)
-        
-        # 提取期初/期末餘額
-        balances = self._extract_balances(text)
+        # 標籤欄位（帳號、餘額）一次掃描
+        fields = self._scan_fields(text)
+        account_number = fields.get('account_number')
+        balances = self._balances_from_fields(fields)
         
-        # 提取交易記錄
-        transactions = self._extract_transactions(text)
+        # 提取交易記錄（摘要只列前 10 筆，收滿即停）
+        transactions = self._extract_transactions(text, limit=10)
         
         return {
             'document_type': 'bank_statement',
@@ -74,7 +232,7 @@ class DocumentProcessor:
                 'total_withdrawals': balances.get('total_withdrawals'),
                 'transaction_count': len(transactions),
             },
-            'transactions': transactions[:10],  # 只返回前 10 筆交易作為摘要
+            'transactions': transactions,
             'all_amounts': amounts.get('all_amounts', []),
             'metadata': metadata,
             'total_pages': content.get('total_pages', 0),
@@ -89,17 +247,14 @@ class DocumentProcessor:
         """
         text = content.get('text', '')
         
-        # 提取應繳金額
-        payment_info = self._extract_payment_info(text)
-        
-        # 提取繳款截止日
-        due_date = self._extract_due_date(text)
+        # 標籤欄位（應繳金額、截止日、卡號）一次掃描
+        fields = self._scan_fields(text)
+        payment_info = self._payment_info_from_fields(fields)
+        due_date = fields.get('due_date')
+        card_number = fields.get('card_number')
         
-        # 提取卡號
-        card_number = self._extract_card_number(text)
-        
-        # 提取消費明細
-        transactions = self._extract_credit_transactions(text)
+        # 提取消費明細（摘要只列前 10 筆，收滿即停）
+        transactions = self._extract_credit_transactions(text, limit=10)
         
         # 提取帳單週期
         billing_period = self._extract_billing_period(text)
@@ -116,7 +271,7 @@ class DocumentProcessor:
                 'new_charges': payment_info.get('new_charges'),
                 'transaction_count': len(transactions),
             },
-            'transactions': transactions[:10],  # 只返回前 10 筆交易作為摘要
+            'transactions': transactions,
             'metadata': metadata,
             'total_pages': content.get('total_pages', 0),
             'processed_at': datetime.now().isoformat()
@@ -137,7 +292,9 @@ class DocumentProcessor:
         dates = PDFParser.extract_dates(text)
         
         # 提取商家資訊
-        merchant = self._extract_merchant_info(text)
+        merchant = self._scan_fields(text).get('merchant')
+        if merchant:
+            merchant = merchant.strip()
         
         # 提取交易類型
         transaction_type = self._extract_transaction_type(text)
@@ -182,155 +339,109 @@ class DocumentProcessor:
     
     # ===== 輔助方法 =====
     
+    @staticmethod
+    def _scan_fields(text: str) -> Dict[str, str]:
+        """
+        單次掃描提取所有標籤欄位
+
+        以 _FIELD_SCAN_RE 對全文做一次 finditer，命中的具名群組
+        對應回欄位名稱；每個欄位以文中最先出現的變體為準，
+        全部欄位都找到時提前結束。結果依文字內容快取，
+        回傳的是共享的快取字典，呼叫端不要就地修改。
+        """
+        return _scan_fields_cached(text)
+
+    @staticmethod
+    def _balances_from_fields(fields: Dict[str, str]) -> Dict[str, float]:
+        """從掃描結果取期初/期末餘額（轉成 float）"""
+        balances = {}
+        for key in ('opening_balance', 'closing_balance'):
+            amount = _parse_amount(fields.get(key))
+            if amount is not None:
+                balances[key] = amount
+        return balances
+
+    @staticmethod
+    def _payment_info_from_fields(fields: Dict[str, str]) -> Dict[str, float]:
+        """從掃描結果取繳款資訊（轉成 float）"""
+        payment_info = {}
+        for key in ('minimum_payment', 'total_amount_due', 'new_charges'):
+            amount = _parse_amount(fields.get(key))
+            if amount is not None:
+                payment_info[key] = amount
+        return payment_info
+
     @staticmethod
     def _extract_account_number(text: str) -> str:
         """提取帳號"""
-        patterns = [
-            r'帳號[:：\s]*(\d{10,})',
-            r'Account(?:\s+Number)?[:：\s]*(\d{10,})',
-            r'戶號[:：\s]*(\d{10,})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        return None
+        return DocumentProcessor._scan_fields(text).get('account_number')
     
     @staticmethod
     def _extract_card_number(text: str) -> str:
         """提取卡號（遮罩後的）"""
-        patterns = [
-            r'卡號[:：\s]*([\d*-]+)',
-            r'Card(?:\s+Number)?[:：\s]*([\d*-]+)',
-            r'\d{4}[-\s*]+\d{4}[-\s*]+\d{4}[-\s*]+\d{4}',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1) if match.lastindex else match.group(0)
-        return None
+        return DocumentProcessor._scan_fields(text).get('card_number')
     
     @staticmethod
     def _extract_balances(text: str) -> Dict[str, float]:
         """提取期初/期末餘額"""
-        balances = {}
-        
-        # 期初餘額
-        opening_patterns = [
-            r'期初餘額[:：\s]*[\$]?([\d,]+\.?\d*)',
-            r'Opening Balance[:：\s]*[\$]?([\d,]+\.?\d*)',
-        ]
-        
-        # 期末餘額
-        closing_patterns = [
-            r'期末餘額[:：\s]*[\$]?([\d,]+\.?\d*)',
-            r'Closing Balance[:：\s]*[\$]?([\d,]+\.?\d*)',
-            r'結餘[:：\s]*[\$]?([\d,]+\.?\d*)',
-        ]
-        
-        for pattern in opening_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    balances['opening_balance'] = float(match.group(1).replace(',', ''))
-                    break
-                except ValueError:
-                    pass
-        
-        for pattern in closing_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    balances['closing_balance'] = float(match.group(1).replace(',', ''))
-                    break
-                except ValueError:
-                    pass
-        
-        return balances
+        return DocumentProcessor._balances_from_fields(
+            DocumentProcessor._scan_fields(text)
+        )
     
     @staticmethod
-    def _extract_transactions(text: str) -> List[Dict[str, Any]]:
-        """提取交易記錄（簡化版）"""
-        # 這裡只做簡單的行解析，實際情況可能需要更複雜的邏輯
+    def _extract_transactions(text: str, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        提取交易記錄（簡化版）
+
+        Args:
+            text: 文件文字
+            limit: 最多收集幾筆；摘要只顯示前幾筆時，收滿就停止掃描，
+                   不用走完整份文件
+        """
+        # 這裡只做簡單的行解析，實際情況可能需要更複雜的邏輯；
+        # 先用一次 re.M 掃描挑出含日期的候選行，候選行上再以
+        # _first_number 取第一個可解析的數字即停——不用跨模組呼叫
+        # extract_numbers 把整行數字 findall 收成列表、全部轉 float
+        # 後只取第一個
         transactions = []
-        lines = text.split('\n')
-        
-        for line in lines:
-            # 嘗試找出包含日期和金額的行
-            dates = PDFParser.extract_dates(line)
-            amounts = PDFParser.extract_numbers(line)
-            
-            if dates and amounts:
+        for match in _TXN_LINE_RE.finditer(text):
+            line = match.group('line')
+            amount = _first_number(line)
+
+            if amount is not None:
                 transactions.append({
-                    'date': dates[0],
-                    'amount': amounts[0] if amounts else None,
+                    'date': match.group('date'),
+                    'amount': amount,
                     'description': line.strip()
                 })
-        
+                if limit is not None and len(transactions) >= limit:
+                    break
+
         return transactions
     
     @staticmethod
-    def _extract_credit_transactions(text: str) -> List[Dict[str, Any]]:
+    def _extract_credit_transactions(text: str, limit: int = None) -> List[Dict[str, Any]]:
         """提取信用卡交易記錄（簡化版）"""
-        return DocumentProcessor._extract_transactions(text)
+        return DocumentProcessor._extract_transactions(text, limit=limit)
     
     @staticmethod
     def _extract_payment_info(text: str) -> Dict[str, float]:
         """提取繳款資訊"""
-        payment_info = {}
-        
-        patterns = {
-            'minimum_payment': [
-                r'最低應繳金額[:：\s]*[\$]?([\d,]+\.?\d*)',
-                r'Minimum Payment[:：\s]*[\$]?([\d,]+\.?\d*)',
-            ],
-            'total_amount_due': [
-                r'本期應繳總額[:：\s]*[\$]?([\d,]+\.?\d*)',
-                r'Total Amount Due[:：\s]*[\$]?([\d,]+\.?\d*)',
-                r'應繳金額[:：\s]*[\$]?([\d,]+\.?\d*)',
-            ],
-            'new_charges': [
-                r'本期新增消費[:：\s]*[\$]?([\d,]+\.?\d*)',
-                r'New Charges[:：\s]*[\$]?([\d,]+\.?\d*)',
-            ]
-        }
-        
-        for key, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    try:
-                        payment_info[key] = float(match.group(1).replace(',', ''))
-                        break
-                    except ValueError:
-                        pass
-        
-        return payment_info
+        return DocumentProcessor._payment_info_from_fields(
+            DocumentProcessor._scan_fields(text)
+        )
     
     @staticmethod
     def _extract_due_date(text: str) -> str:
         """提取繳款截止日"""
-        patterns = [
-            r'繳款截止日[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)',
-            r'Due Date[:：\s]*(\d{4}[-/]\d{1,2}[-/]\d{1,2})',
-            r'到期日[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        return None
+        return DocumentProcessor._scan_fields(text).get('due_date')
     
     @staticmethod
     def _extract_billing_period(text: str) -> Dict[str, str]:
         """提取帳單週期"""
         period = {}
         
-        pattern = r'帳單週期[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)\s*[至~-]\s*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2}[日]?)'
-        match = re.search(pattern, text)
+        match = _BILLING_PERIOD_RE.search(text)
         
         if match:
             period['start_date'] = match.group(1)
@@ -341,35 +452,11 @@ class DocumentProcessor:
     @staticmethod
     def _extract_merchant_info(text: str) -> str:
         """提取商家資訊"""
-        # 尋找常見的商家資訊模式
-        patterns = [
-            r'商家[:：\s]*([^\n]+)',
-            r'Merchant[:：\s]*([^\n]+)',
-            r'消費地點[:：\s]*([^\n]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        
-        return None
+        merchant = DocumentProcessor._scan_fields(text).get('merchant')
+        return merchant.strip() if merchant else None
     
     @staticmethod
     def _extract_transaction_type(text: str) -> str:
-        """提取交易類型"""
-        transaction_types = {
-            '消費': ['消費', 'Purchase', 'Debit'],
-            '退款': ['退款', 'Refund', 'Credit'],
-            '轉帳': ['轉帳', 'Transfer'],
-            '提款': ['提款', 'Withdrawal', 'ATM'],
-        }
-        
-        text_lower = text.lower()
-        for trans_type, keywords in transaction_types.items():
-            for keyword in keywords:
-                if keyword.lower() in text_lower:
-                    return trans_type
-        
-        return '其他'
+        """提取交易類型（單次掃描全文，類別依優先序取捨；結果依文字快取）"""
+        return _transaction_type_cached(text)
 
@@ -0,0 +1,34 @@
+"""
+環境變數載入工具
+
+load_dotenv 每次呼叫都會重新讀檔解析 .env；多個測試腳本在同一個
+行程裡互相 import（或被測試框架一起收集）時會重複付這筆成本。
+ensure_env 以「.env 路徑 + mtime」為 key 快取載入結果，同一行程內
+重複呼叫直接略過，檔案被修改時（mtime 變動）才重新解析。
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=None)
+def _loaded(path: str, mtime: float) -> bool:
+    return load_dotenv(path, override=False)
+
+
+def ensure_env(path: str = '.env') -> bool:
+    """
+    確保 .env 已載入（同一行程內只解析一次）
+
+    Args:
+        path: .env 檔案路徑
+
+    Returns:
+        load_dotenv 的回傳值（檔案不存在時為 False）
+    """
+    p = Path(path)
+    return _loaded(str(p.resolve()), p.stat().st_mtime if p.exists() else 0.0)
+
+
+__all__ = ['ensure_env']
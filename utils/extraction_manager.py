@@ -4,7 +4,7 @@
 管理多個提取器，支援規則提取和 AI fallback
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from .extractors.base_extractor import BaseExtractor
 from .extractors.fubon_credit_card_extractor import FubonCreditCardExtractor
 from .schema_validator import SchemaValidator
@@ -101,6 +101,28 @@ class ExtractionManager:
         
         return result
     
+    def extract_stream(self, chunks: Iterable[Tuple[str, str]],
+                       metadata: Optional[Dict] = None,
+                       validate: bool = True) -> Dict[str, Any]:
+        """
+        從遮罩串流提取資訊
+
+        消費 PrivacyMasker.mask_stream 產生的 (kind, chunk) 串流，
+        讓遮罩掃描與提取融合為同一趟。規則提取器以正則比對整份
+        文字，所以串流在這裡以 ''.join 一次組回（C-level 單趟）；
+        呼叫端不必另外 materialize 完整的遮罩結果。
+
+        Args:
+            chunks: (kind, chunk) tuple 的可迭代物件
+            metadata: 額外的元資料
+            validate: 是否驗證輸出
+
+        Returns:
+            提取結果（與 extract 相同格式）
+        """
+        text = ''.join(chunk for _kind, chunk in chunks)
+        return self.extract(text, metadata=metadata, validate=validate)
+
     def _try_ai_extraction(self, text: str, document_type: Optional[str] = None) -> Dict[str, Any]:
         """嘗試 AI 提取"""
         result = {
@@ -113,7 +135,8 @@ class ExtractionManager:
         
         try:
             provider_enum = AIProvider(self.ai_provider)
-            integrator = AIIntegrator(provider=provider_enum)
+            # temperature=0：結構化提取要決定性輸出，預設快取才有效
+            integrator = AIIntegrator(provider=provider_enum, temperature=0)
             
             # 使用 AI 分析
             ai_response = integrator.analyze_document(
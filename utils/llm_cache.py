@@ -0,0 +1,243 @@
+"""
+LLM 回應快取
+
+以 (provider, model, 文件類型, 指示, 文字內容) 的 SHA-256 為 key，
+把成功的 AI 回應存成磁碟上的 JSON 檔。開發時對同一份文件重跑
+analyze/process 直接讀快取，不重複呼叫遠端 API（省時間也省 token）。
+
+另提供選用的語意快取（SemanticCache）：精確快取因少數交易列不同而
+未命中時，以本地 embedding 模型比對餘弦相似度，夠相似就直接回傳
+先前快取的分析結果。需要安裝 sentence-transformers 套件。
+
+快取目錄可透過環境變數 LLM_CACHE_DIR 調整（預設 .cache/llm）。
+"""
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# sentence-transformers 為選用套件（只有語意快取需要）
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+CACHE_DIR = Path(os.getenv('LLM_CACHE_DIR', '.cache/llm'))
+
+# 語意快取使用的 embedding 模型（多語言，中文 PDF 也適用）與相似度門檻
+SEMANTIC_MODEL = os.getenv(
+    'LLM_SEMANTIC_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2'
+)
+SEMANTIC_THRESHOLD = float(os.getenv('LLM_SEMANTIC_THRESHOLD', '0.95'))
+
+
+def make_key(
+    provider: str,
+    model: str,
+    document_type: str,
+    instructions: Optional[str],
+    text: str
+) -> str:
+    """
+    計算快取 key
+
+    Args:
+        provider: AI 服務提供者
+        model: 模型名稱
+        document_type: 文件類型
+        instructions: 額外指示
+        text: 文件文字內容
+
+    Returns:
+        SHA-256 十六進位字串
+    """
+    payload = json.dumps({
+        'provider': provider,
+        'model': model,
+        'document_type': document_type,
+        'instructions': instructions,
+        'text': text
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_params_key(
+    provider: str,
+    model: str,
+    document_type: str,
+    instructions: Optional[str]
+) -> str:
+    """
+    計算「分析參數」的 key（不含文字內容）
+
+    語意快取只在 provider/model/文件類型/指示完全相同的項目之間
+    比對相似度，避免把不同任務的回應混在一起。
+
+    Args:
+        provider: AI 服務提供者
+        model: 模型名稱
+        document_type: 文件類型
+        instructions: 額外指示
+
+    Returns:
+        SHA-256 十六進位字串
+    """
+    payload = json.dumps({
+        'provider': provider,
+        'model': model,
+        'document_type': document_type,
+        'instructions': instructions
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get(key: str) -> Optional[Dict]:
+    """
+    讀取快取的回應
+
+    Args:
+        key: make_key 產生的快取 key
+
+    Returns:
+        快取的回應字典；未命中或檔案損毀時為 None
+    """
+    try:
+        with open(CACHE_DIR / f'{key}.json', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def put(key: str, value: Dict):
+    """
+    寫入快取（先寫暫存檔再 rename，避免讀到寫到一半的檔案）
+
+    Args:
+        key: make_key 產生的快取 key
+        value: 要快取的回應字典
+    """
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = CACHE_DIR / f'{key}.json'
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        # 快取寫入失敗不影響主流程
+        pass
+
+
+class SemanticCache:
+    """
+    語意快取（L2）
+
+    精確快取未命中時，把遮罩後的文字 embed 成向量，與索引中
+    「相同分析參數」的項目逐一比對餘弦相似度；超過門檻就回傳
+    該項目對應的快取回應。索引存成 CACHE_DIR/semantic_index.jsonl
+    （一行一個項目），回應本體沿用精確快取的 JSON 檔。
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError(
+                '語意快取需要安裝 sentence-transformers 套件'
+            )
+        self.threshold = threshold if threshold is not None else SEMANTIC_THRESHOLD
+        self._model = SentenceTransformer(SEMANTIC_MODEL)
+        self._index_path = CACHE_DIR / 'semantic_index.jsonl'
+        self._entries = self._load_index()
+
+    def _load_index(self) -> List[Tuple[str, str, List[float]]]:
+        """載入索引；損毀的行直接略過"""
+        entries = []
+        try:
+            with open(self._index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        entries.append(
+                            (row['params'], row['key'], row['embedding'])
+                        )
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+        return entries
+
+    def _encode(self, text: str) -> List[float]:
+        """把文字 embed 成向量"""
+        return [float(x) for x in self._model.encode(text)]
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        """餘弦相似度；長度不符或零向量時為 0"""
+        if len(a) != len(b):
+            return 0.0
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(x * x for x in b))
+        return dot / norm if norm else 0.0
+
+    def get(self, params_key: str, text: str) -> Optional[Dict]:
+        """
+        近似查詢
+
+        Args:
+            params_key: make_params_key 產生的參數 key
+            text: 遮罩後的文件文字
+
+        Returns:
+            最相似項目的快取回應；沒有超過門檻的項目時為 None
+        """
+        embedding = self._encode(text)
+        best_key = None
+        best_score = self.threshold
+        for params, key, vector in self._entries:
+            if params != params_key:
+                continue
+            score = self._cosine(embedding, vector)
+            if score >= best_score:
+                best_score = score
+                best_key = key
+        if best_key is None:
+            return None
+        return get(best_key)
+
+    def add(self, params_key: str, text: str, key: str):
+        """
+        把新項目加入索引（回應本體由精確快取的 put 負責寫入）
+
+        Args:
+            params_key: make_params_key 產生的參數 key
+            text: 遮罩後的文件文字
+            key: make_key 產生的精確快取 key
+        """
+        if any(entry[1] == key for entry in self._entries):
+            return
+        embedding = self._encode(text)
+        self._entries.append((params_key, key, embedding))
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with open(self._index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'params': params_key,
+                    'key': key,
+                    'embedding': embedding
+                }) + '\n')
+        except OSError:
+            # 索引寫入失敗不影響主流程
+            pass
+
+
+__all__ = [
+    'make_key',
+    'make_params_key',
+    'get',
+    'put',
+    'SemanticCache',
+    'SENTENCE_TRANSFORMERS_AVAILABLE',
+    'CACHE_DIR'
+]
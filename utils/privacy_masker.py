@@ -10,9 +10,30 @@
 
 import os
 import re
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
+# flashtext（Aho-Corasick 風格的關鍵字比對）對大量「字面」關鍵字
+# 的批次取代是 O(文字長度)，與字典大小無關；未安裝時退回合併正則
+try:
+    from flashtext import KeywordProcessor
+    FLASHTEXT_AVAILABLE = True
+except ImportError:
+    FLASHTEXT_AVAILABLE = False
+
+
+@lru_cache(maxsize=None)
+def _compile_pattern(pattern: str) -> re.Pattern:
+    """編譯單一模式（全行程共用，重複建立遮罩器不會重新編譯）"""
+    return re.compile(pattern)
+
+
+@lru_cache(maxsize=64)
+def _compile_combined(parts: tuple) -> re.Pattern:
+    """編譯合併後的正則（以各類型的模式組合為 key 快取）"""
+    return re.compile('|'.join(parts))
+
 
 @dataclass
 class MaskResult:
@@ -157,11 +178,39 @@ class PrivacyMasker:
             if mask_type in self.PATTERNS:
                 pattern_info = self.PATTERNS[mask_type]
                 compiled[mask_type] = {
-                    'regex': re.compile(pattern_info['pattern']),
+                    'regex': _compile_pattern(pattern_info['pattern']),
                     'name': pattern_info['name'],
                     'mask_func': pattern_info['mask']
                 }
+
+        # 合併為單一正則（named group 對應類型），讓 mask/detect
+        # 只需線性掃描文字一次，而非每個類型各掃一遍
+        self._combined_regex = self._build_combined_regex(compiled)
         return compiled
+
+    def _build_combined_regex(self, compiled: Dict) -> Optional[re.Pattern]:
+        """
+        將所有已編譯的模式合併為單一正則表達式
+
+        自訂姓名放在最前面，維持原本「姓名優先遮罩」的順序；
+        同一位置有多個類型可匹配時，以排在前面的類型為準。
+
+        Args:
+            compiled: _compile_patterns 產生的模式字典
+
+        Returns:
+            合併後的正則表達式（無任何模式時為 None）
+        """
+        ordered = sorted(compiled, key=lambda t: t != 'custom_names')
+        parts = []
+        for mask_type in ordered:
+            pattern = compiled[mask_type]['regex'].pattern
+            if mask_type == 'custom_names':
+                # 使用 word boundary 確保完整匹配
+                pattern = r'\b(?:' + pattern + r')\b'
+            parts.append(f'(?P<{mask_type}>{pattern})')
+
+        return _compile_combined(tuple(parts)) if parts else None
     
     def mask(self, text: str) -> MaskResult:
         """
@@ -173,51 +222,81 @@ class PrivacyMasker:
         Returns:
             MaskResult: 遮罩結果
         """
-        masked_text = text
         sensitive_items = []
-        mask_count = 0
-        
-        # 先處理自訂姓名（避免部分匹配問題）
-        if 'custom_names' in self.compiled_patterns:
-            pattern_info = self.compiled_patterns['custom_names']
-            # 使用 word boundary 確保完整匹配
-            pattern_with_boundary = r'\b(' + pattern_info['regex'].pattern + r')\b'
-            compiled_pattern = re.compile(pattern_with_boundary)
-            matches = list(compiled_pattern.finditer(masked_text))
-            
-            # 從後往前替換，避免位置偏移問題
-            for match in reversed(matches):
-                original_value = match.group(1)  # 取得第一個捕獲組
-                masked_value = pattern_info['mask_func'](original_value)
-                
-                # 記錄敏感資料
-                sensitive_items.append({
-                    'type': 'custom_names',
-                    'type_name': pattern_info['name'],
-                    'original': original_value,
-                    'masked': masked_value,
-                    'position': match.span(1)  # 使用捕獲組的位置
-                })
-                
-                # 替換文字
-                start, end = match.span(1)
-                masked_text = masked_text[:start] + masked_value + masked_text[end:]
-                mask_count += 1
-        
-        # 依序處理其他類型
-        for mask_type, pattern_info in self.compiled_patterns.items():
-            if mask_type == 'custom_names':
-                continue  # 已經處理過了
-            
-            matches = pattern_info['regex'].finditer(masked_text)
-            
-            # 從後往前替換，避免位置偏移問題
-            matches_list = list(matches)
-            for match in reversed(matches_list):
-                original_value = match.group()
-                masked_value = pattern_info['mask_func'](original_value)
-                
-                # 記錄敏感資料
+
+        # 空白文字或沒有任何模式時直接短路，不進正則引擎
+        if not text or self._combined_regex is None:
+            return MaskResult(
+                original=text,
+                masked=text,
+                sensitive_items=[],
+                mask_count=0
+            )
+
+        def _replace(match: re.Match) -> str:
+            mask_type = match.lastgroup
+            pattern_info = self.compiled_patterns[mask_type]
+            original_value = match.group()
+            masked_value = pattern_info['mask_func'](original_value)
+
+            # 記錄敏感資料（位置為原始文字中的位置）
+            sensitive_items.append({
+                'type': mask_type,
+                'type_name': pattern_info['name'],
+                'original': original_value,
+                'masked': masked_value,
+                'position': match.span()
+            })
+            return masked_value
+
+        # 單次線性掃描：所有類型一次比對、一次替換
+        masked_text = self._combined_regex.sub(_replace, text)
+
+        return MaskResult(
+            original=text,
+            masked=masked_text,
+            sensitive_items=sensitive_items,
+            mask_count=len(sensitive_items)
+        )
+    
+    def mask_stream(
+        self,
+        text: str,
+        sensitive_items: Optional[List[Dict]] = None
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        以串流方式遮罩文字
+
+        與 mask 同一次線性掃描，但逐段產出 (kind, chunk)：
+        ('plain', 原文片段) 或 ('masked', 遮罩後的值)，下游可以
+        邊消費邊寫檔或提取，不必先組出完整的遮罩字串。
+
+        Args:
+            text: 原始文字
+            sensitive_items: 選用的列表；提供時偵測到的敏感項目
+                會 append 進去（格式與 MaskResult.sensitive_items 相同）
+
+        Yields:
+            (kind, chunk) tuple
+        """
+        if not text:
+            return
+        if self._combined_regex is None:
+            yield ('plain', text)
+            return
+
+        pos = 0
+        for match in self._combined_regex.finditer(text):
+            start, end = match.span()
+            if start > pos:
+                yield ('plain', text[pos:start])
+
+            mask_type = match.lastgroup
+            pattern_info = self.compiled_patterns[mask_type]
+            original_value = match.group()
+            masked_value = pattern_info['mask_func'](original_value)
+
+            if sensitive_items is not None:
                 sensitive_items.append({
                     'type': mask_type,
                     'type_name': pattern_info['name'],
@@ -225,19 +304,93 @@ class PrivacyMasker:
                     'masked': masked_value,
                     'position': match.span()
                 })
-                
-                # 替換文字
-                start, end = match.span()
-                masked_text = masked_text[:start] + masked_value + masked_text[end:]
+            yield ('masked', masked_value)
+            pos = end
+
+        if pos < len(text):
+            yield ('plain', text[pos:])
+
+    def mask_to(
+        self,
+        text: str,
+        out_fh,
+        sensitive_items: Optional[List[Dict]] = None
+    ) -> int:
+        """
+        遮罩文字並直接寫入檔案物件
+
+        mask 會在記憶體組出完整的遮罩字串；大文件時原文與遮罩文
+        兩份並存會讓峰值記憶體翻倍。這裡走 mask_stream 逐段寫出，
+        不建立中間字串。
+
+        Args:
+            text: 原始文字
+            out_fh: 可寫入的檔案物件（文字模式）
+            sensitive_items: 選用的列表；同 mask_stream
+
+        Returns:
+            遮罩項目數量
+        """
+        mask_count = 0
+        for kind, chunk in self.mask_stream(text, sensitive_items):
+            if kind == 'masked':
                 mask_count += 1
-        
-        return MaskResult(
-            original=text,
-            masked=masked_text,
-            sensitive_items=sensitive_items,
-            mask_count=mask_count
-        )
-    
+            out_fh.write(chunk)
+        return mask_count
+
+    def mask_bulk(self, texts: List[str]) -> List[MaskResult]:
+        """
+        批次遮罩多段文字
+
+        同一個遮罩器重複使用已編譯的合併正則，比每段文字各建一個
+        遮罩器省去重複編譯。當啟用的類型只有字面關鍵字（自訂姓名）
+        且裝有 flashtext 時，改用 KeywordProcessor 做單趟關鍵字比對
+        ——掃描成本與字典大小無關，姓名清單很長時優於正則 alternation。
+        注意 flashtext 以非英數字元為詞界，中文姓名的邊界判定比 \\b
+        寬鬆（緊鄰其他中文字也會命中），只會多遮不會少遮。
+
+        Args:
+            texts: 要遮罩的文字列表
+
+        Returns:
+            與輸入順序一致的 MaskResult 列表
+        """
+        if (FLASHTEXT_AVAILABLE and self.custom_names
+                and set(self.compiled_patterns) == {'custom_names'}):
+            # 處理器建一次，所有輸入共用
+            keyword_processor = KeywordProcessor(case_sensitive=True)
+            for name in self.custom_names:
+                keyword_processor.add_keyword(name, '*' * len(name))
+
+            results = []
+            for text in texts:
+                sensitive_items = []
+                parts = []
+                pos = 0
+                for masked_value, start, end in keyword_processor.extract_keywords(
+                        text, span_info=True):
+                    parts.append(text[pos:start])
+                    parts.append(masked_value)
+                    sensitive_items.append({
+                        'type': 'custom_names',
+                        'type_name': '自訂姓名',
+                        'original': text[start:end],
+                        'masked': masked_value,
+                        'position': (start, end)
+                    })
+                    pos = end
+                parts.append(text[pos:])
+
+                results.append(MaskResult(
+                    original=text,
+                    masked=''.join(parts),
+                    sensitive_items=sensitive_items,
+                    mask_count=len(sensitive_items)
+                ))
+            return results
+
+        return [self.mask(text) for text in texts]
+
     def mask_dict(self, data: Dict) -> Dict:
         """
         遮罩字典中的敏感資訊
@@ -10,7 +10,7 @@ from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
 try:
-    from jsonschema import validate, ValidationError, Draft7Validator
+    from jsonschema import ValidationError, Draft7Validator
     JSONSCHEMA_AVAILABLE = True
 except ImportError:
     JSONSCHEMA_AVAILABLE = False
@@ -29,7 +29,32 @@ class SchemaValidator:
         """
         self.schemas_dir = Path(schemas_dir)
         self.schemas_cache = {}
-    
+        self.validators_cache = {}
+
+    def get_validator(self, schema_name: str) -> 'Draft7Validator':
+        """
+        取得編譯好的驗證器
+
+        Draft7Validator 建構時會解析並 meta-驗證整份 Schema，
+        成本遠高於驗證本身；每個 Schema 只建構一次並快取，
+        批次驗證多份文件時重複使用同一個實例。
+
+        Args:
+            schema_name: Schema 名稱
+
+        Returns:
+            快取的 Draft7Validator 實例
+        """
+        if schema_name in self.validators_cache:
+            return self.validators_cache[schema_name]
+
+        schema = self.load_schema(schema_name)
+        Draft7Validator.check_schema(schema)
+        validator = Draft7Validator(schema)
+        self.validators_cache[schema_name] = validator
+        return validator
+
+
     def load_schema(self, schema_name: str) -> Dict:
         """
         載入 Schema
@@ -69,8 +94,7 @@ class SchemaValidator:
             return False, ["jsonschema 套件未安裝"]
         
         try:
-            schema = self.load_schema(schema_name)
-            validate(instance=data, schema=schema)
+            self.get_validator(schema_name).validate(data)
             return True, None
         
         except ValidationError as e:
@@ -116,9 +140,8 @@ class SchemaValidator:
             return result
         
         try:
-            schema = self.load_schema(schema_name)
-            validator = Draft7Validator(schema)
-            
+            validator = self.get_validator(schema_name)
+
             # 收集所有錯誤
             errors = list(validator.iter_errors(data))
             
@@ -136,7 +159,7 @@ class SchemaValidator:
                 ]
             
             # 檢查警告（選填欄位缺失等）
-            result['warnings'] = self._check_warnings(data, schema)
+            result['warnings'] = self._check_warnings(data, self.load_schema(schema_name))
             
         except FileNotFoundError as e:
             result['errors'] = [{'message': str(e)}]